@@ -1,9 +1,20 @@
 import requests
 import logging
+import time
+from datetime import date
 
 
 class WeatherAPIURL:
     URL = 'http://api.weatherapi.com/v1/current.json'
+    HISTORY = 'history.json' # served next to current.json
+    FORECAST = 'forecast.json'
+    MAX_HISTORY_DAYS = 30 # longest dt to end_dt range of a single history call
+    MAX_FORECAST_DAYS = 14
+
+class ThrottleSettings:
+    STATUS_CODE = 429
+    MAX_RETRIES = 3
+    BACKOFF = 5 # seconds to wait after a 429 without a Retry-After header when no rate limiter is shared
 
 class RelevantLocationData:
     '''
@@ -16,6 +27,8 @@ class RelevantLocationData:
     LOCALTIME = 'localtime'
     ALLORIGINALLOCATIONKEYS = [COUNTRY, STATE, CITY, ZIPCODE]
     ALLLOCATIONKEYS = [COUNTRY, STATE, CITY, ZIPCODE, LOCALTIME]
+    # location block fields used when a column is missing in the csv (zipcode not provided in API response)
+    APILOCATIONFIELDS = {COUNTRY: 'country', STATE: 'region', CITY: 'name'}
 
 class RelevantCurrentData:
     LASTUPDATED = 'last_updated'
@@ -26,6 +39,16 @@ class RelevantCurrentData:
     ALLCURRENTKEYS = [LASTUPDATED, CLOUD, WINDSPEED, HUMIDITY, PRESSURE]
     ALLCURRENTCSVCOLS = ['Last Updated', 'Clouds (%)', 'Wind Speed (mph)', 'Humidity (%)', 'Pressure (mb)']
 
+class RelevantHourData:
+    '''
+    Fields of the hourly weather in history/forecast responses, used by backfill.
+    '''
+    TIME = 'time'
+    TIMECSVCOL = 'Weather Time'
+    ALLHOURKEYS = [RelevantCurrentData.CLOUD, RelevantCurrentData.WINDSPEED, RelevantCurrentData.HUMIDITY,
+                   RelevantCurrentData.PRESSURE]
+    ALLHOURCSVCOLS = ['Clouds (%)', 'Wind Speed (mph)', 'Humidity (%)', 'Pressure (mb)']
+
 class TemperatureAPIFields:
     temperature_mapping = {'c':'temp_c', 'f':'temp_f'}
 
@@ -34,10 +57,13 @@ class WeatherAPIClient:
     '''
     API client wrapper for Weather API
     '''
-    def __init__(self, api_key):
+    def __init__(self, api_key, rate_limiter=None, url=None, metrics=None):
         self.api_key = api_key
+        self.rate_limiter = rate_limiter # optional RateLimiter shared between clients
+        self.metrics = metrics # optional RunMetrics recording upstream latency and errors
         api_url = WeatherAPIURL()
-        self.url = api_url.URL
+        self.url = url or api_url.URL # url of a local weather_service can replace the API
+        self.base_url = self.url.rsplit('/', 1)[0]
         self.logger = self._setup_logger()
         self.RelevantLocationData = RelevantLocationData()
         self.RelevantCurrentData = RelevantCurrentData()
@@ -75,14 +101,15 @@ class WeatherAPIClient:
 
         if (original_data[self.RelevantLocationData.COUNTRY] and (original_data[self.RelevantLocationData.ZIPCODE] or
                                                                   original_data[self.RelevantLocationData.CITY])):
-            self.logger.info(f'Valid CSV input row: {original_data}')
+            # per row logs are debug and lazily formatted so they cost nothing on large files
+            self.logger.debug('Valid CSV input row: %s', original_data)
             parts = [val for key, val in original_data.items() if val]
             query =  ", ".join(parts).lower() # so same location but different cases are identified
-            self.logger.info(f'Query: {query}')
+            self.logger.debug('Query: %s', query)
             return query, original_data
 
         else:
-            self.logger.info(f'Insufficient data in csv row {original_data}. \n Required: Country and (zipcode or city).')
+            self.logger.debug('Insufficient data in csv row %s. \n Required: Country and (zipcode or city).', original_data)
             return None, original_data
 
 
@@ -90,20 +117,74 @@ class WeatherAPIClient:
         '''
         Use WeatherAPI to fetch weather data.
         '''
-        params = {
-            'q': query,
-            'key': self.api_key
-        }
-
-        try:
-            response = requests.get(self.url, params=params)
-            response.raise_for_status()
-        except Exception as e:
-            self.logger.error(f"API error for query '{query}': {e}")
+        raw_data = self._get(self.url, {'q': query}, query)
+        if raw_data is None:
             return None, None  # signals failure and row remains unchanged
-        self.logger.info('Successful API response')
+        return raw_data, query
+
+    def fetch_history(self, query, start_date, end_date):
+        '''
+        Fetch the hourly weather of every day from start_date to end_date (datetime.date, at most
+        WeatherAPIURL.MAX_HISTORY_DAYS apart) in a single call. Returns None if the call failed.
+        '''
+        params = {'q': query, 'dt': start_date.isoformat(), 'end_dt': end_date.isoformat()}
+        return self._get(f'{self.base_url}/{WeatherAPIURL.HISTORY}', params, query)
 
-        return response.json(), query
+    def fetch_forecast(self, query, end_date):
+        '''
+        Fetch the hourly forecast from today up to end_date (at most WeatherAPIURL.MAX_FORECAST_DAYS ahead)
+        in a single call. Returns None if the call failed.
+        '''
+        days = min((end_date - date.today()).days + 1, WeatherAPIURL.MAX_FORECAST_DAYS)
+        return self._get(f'{self.base_url}/{WeatherAPIURL.FORECAST}', {'q': query, 'days': max(days, 1)}, query)
+
+    def _get(self, url, params, query):
+        '''
+        GET an API endpoint through the rate limiter, retrying throttled calls.
+        Returns the JSON response or None if the call failed.
+        '''
+        params = dict(params, key=self.api_key)
+
+        for attempt in range(ThrottleSettings.MAX_RETRIES + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire() # QuotaExhaustedError stops the job rather than failing every row
+
+            started = time.perf_counter()
+            try:
+                response = requests.get(url, params=params)
+                if response.status_code == ThrottleSettings.STATUS_CODE and attempt < ThrottleSettings.MAX_RETRIES:
+                    self._record_call(started, f'HTTP {response.status_code}')
+                    self.logger.warning(f"API throttled query '{query}', retrying")
+                    retry_after = response.headers.get('Retry-After')
+                    if self.rate_limiter:
+                        self.rate_limiter.throttled(retry_after)
+                    else:
+                        time.sleep(float(retry_after or ThrottleSettings.BACKOFF))
+                    continue
+                response.raise_for_status()
+            except Exception as e:
+                self._record_call(started, self._error_type(e))
+                self.logger.error(f"API error for query '{query}': {e}")
+                return None
+            self._record_call(started)
+            break
+        self.logger.debug('Successful API response')
+
+        return response.json()
+
+    def _record_call(self, started, error=None):
+        if self.metrics:
+            self.metrics.api_call(time.perf_counter() - started, error)
+
+    @staticmethod
+    def _error_type(error):
+        '''
+        Group errors by HTTP status where there is one, otherwise by exception type.
+        '''
+        response = getattr(error, 'response', None)
+        if response is not None:
+            return f'HTTP {response.status_code}'
+        return type(error).__name__
 
     def _setup_logger(self):
         '''
@@ -0,0 +1,167 @@
+'''
+Historical/forecast backfill for FetchWeather.
+Enriches every row with the weather at the hour of its own timestamp instead of the current weather.
+Rows are read in chunks, grouped by (location, date) and the missing days of each location are fetched with one
+history call per range of up to WeatherAPIURL.MAX_HISTORY_DAYS days (one forecast call for future dates).
+Whole days are cached and hourly lookups are served from the cache, so API calls scale with unique location-days.
+NOTE: Event timestamps are assumed to be in the local time of the location, like the hours returned by the API.
+'''
+
+import csv
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import islice
+from WeatherApiClient import WeatherAPIURL, RelevantLocationData, RelevantHourData, TemperatureAPIFields
+
+
+class WeatherBackfill:
+    def __init__(self, fetch_weather, timestamp_column='timestamp', chunk_size=100000):
+        self.fetch_weather = fetch_weather
+        self.api_client = fetch_weather.api_client
+        self.resolver = fetch_weather.resolver
+        self.shared_cache = fetch_weather.shared_cache
+        self.timestamp_column = timestamp_column
+        self.chunk_size = chunk_size
+        self.days = {} # (location key, 'YYYY-MM-DD') -> {'YYYY-MM-DD HH:00': hour fields}, empty if unavailable
+        self.locations = {} # location key -> location block of the API response
+        self.csv_columns = (RelevantLocationData.ALLORIGINALLOCATIONKEYS + [timestamp_column, RelevantHourData.TIMECSVCOL]
+                            + RelevantHourData.ALLHOURCSVCOLS + [fetch_weather.temp_col])
+
+    def run(self, writer):
+        '''
+        Enrich the input chunk by chunk through writer (see output_writers). Returns the number of rows.
+        '''
+        rows = 0
+        with open(self.fetch_weather.csv_path, mode='r', newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            while True:
+                chunk = list(islice(reader, self.chunk_size))
+                if not chunk:
+                    break
+                self.enrich_chunk(chunk, writer)
+                rows += len(chunk)
+                self.fetch_weather.metrics.row_done(len(chunk))
+        return rows
+
+    def enrich_chunk(self, chunk, writer):
+        prepared = []
+        needed = defaultdict(set) # query -> dates without cached weather
+        for row in chunk:
+            query, original_data = self.api_client.build_query(row)
+            event_time = self.parse_timestamp(row.get(self.timestamp_column, ''))
+            if query and event_time:
+                if self.cached_day(query, event_time.date()) is None:
+                    needed[query].add(event_time.date())
+                else:
+                    self.fetch_weather.metrics.cache_hit()
+            prepared.append((row, original_data, query, event_time))
+
+        for query, dates in needed.items():
+            self.fetch_days(query, dates)
+
+        for row, original_data, query, event_time in prepared:
+            writer.writerow(self.parse_row(row, original_data, query, event_time))
+
+    def fetch_days(self, query, dates):
+        '''
+        Fetch the missing dates of a location, batching past dates into history ranges and future dates into
+        a single forecast call. Days the API cannot provide are cached as empty so they are not requested again.
+        '''
+        missing = sorted(day for day in dates if self.cached_day(query, day) is None) # variants may have resolved
+        if not missing:
+            return
+        today = date.today()
+        past = [day for day in missing if day < today]
+        future = [day for day in missing if day >= today]
+
+        for start, end in self.date_ranges(past, WeatherAPIURL.MAX_HISTORY_DAYS):
+            self.fetch_weather.metrics.cache_miss()
+            self.store_days(query, self.api_client.fetch_history(query, start, end))
+        if future:
+            self.fetch_weather.metrics.cache_miss()
+            self.store_days(query, self.api_client.fetch_forecast(query, future[-1]))
+
+        location_key = self.resolver.cache_key(query)
+        for day in missing:
+            self.days.setdefault((location_key, day.isoformat()), {})
+
+    def store_days(self, query, raw_data):
+        '''
+        Cache every day of a history/forecast response, keeping only the hourly fields that are written out.
+        '''
+        if raw_data is None:
+            return
+        location_key = self.resolver.learn(query, raw_data)
+        self.locations[location_key] = raw_data['location']
+        hour_fields = [RelevantHourData.TIME] + RelevantHourData.ALLHOURKEYS + list(TemperatureAPIFields.temperature_mapping.values())
+        for forecast_day in raw_data['forecast']['forecastday']:
+            hours = {hour[RelevantHourData.TIME]: {field: hour[field] for field in hour_fields}
+                     for hour in forecast_day['hour']}
+            self.days[(location_key, forecast_day['date'])] = hours
+            if self.shared_cache:
+                self.shared_cache.set(f"day:{location_key}:{forecast_day['date']}",
+                                      {'location': raw_data['location'], 'hours': hours})
+
+    def cached_day(self, query, day):
+        '''
+        Return the cached hours of a location's day, or None if the day has not been fetched.
+        '''
+        location_key = self.resolver.cache_key(query)
+        key = (location_key, day.isoformat())
+        if key not in self.days and self.shared_cache:
+            # past days never change, forecast days go stale like current weather
+            max_age = float('inf') if day < date.today() else None
+            cached = self.shared_cache.get(f'day:{location_key}:{key[1]}', max_age=max_age)
+            if cached is not None:
+                self.days[key] = cached['hours']
+                self.locations[location_key] = cached['location']
+        return self.days.get(key)
+
+    def parse_row(self, row, original_data, query, event_time):
+        parsed = dict(original_data)
+        parsed[self.timestamp_column] = row.get(self.timestamp_column, '')
+        if not query or not event_time:
+            return parsed
+
+        location_key = self.resolver.cache_key(query)
+        location = self.locations.get(location_key)
+        if location:
+            for loc, api_field in RelevantLocationData.APILOCATIONFIELDS.items():
+                if not parsed[loc]:
+                    parsed[loc] = location[api_field]
+
+        hour = self.days.get((location_key, event_time.date().isoformat()), {}).get(event_time.strftime('%Y-%m-%d %H:00'))
+        if hour is None:
+            return parsed
+        parsed[RelevantHourData.TIMECSVCOL] = hour[RelevantHourData.TIME]
+        temp_unit = self.fetch_weather.temp_unit_lower
+        if temp_unit == 'k':
+            parsed[self.fetch_weather.temp_col] = hour[TemperatureAPIFields.temperature_mapping['c']] + 273.15
+        else:
+            parsed[self.fetch_weather.temp_col] = hour[TemperatureAPIFields.temperature_mapping[temp_unit]]
+        for hour_key, csv_col in zip(RelevantHourData.ALLHOURKEYS, RelevantHourData.ALLHOURCSVCOLS):
+            parsed[csv_col] = hour[hour_key]
+        return parsed
+
+    @staticmethod
+    def parse_timestamp(value):
+        '''
+        Parse an ISO 8601 event timestamp, None if it is missing or invalid.
+        '''
+        try:
+            return datetime.fromisoformat(value.strip()).replace(tzinfo=None)
+        except (ValueError, AttributeError):
+            return None
+
+    @staticmethod
+    def date_ranges(dates, max_days):
+        '''
+        Group sorted dates into (start, end) ranges spanning at most max_days days each.
+        '''
+        ranges = []
+        for day in dates:
+            if ranges and day - ranges[-1][0] < timedelta(days=max_days):
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+        return [tuple(day_range) for day_range in ranges]
@@ -0,0 +1,169 @@
+'''
+End-to-end benchmark of weather_module.py against a local fake Weather API.
+Generates a synthetic input csv with a controlled share of duplicate locations, runs weather_module.py in every
+requested mode as a subprocess and reports rows/s, peak memory (RSS) and the number of API calls per mode.
+
+Modes:
+    sequential - row by row path fetching every row (--no-dedup), the baseline
+    deduped    - default row by row path, repeated locations and their variants are fetched once
+    concurrent - deduped path split over --workers processes
+    columnar   - chunked pandas path
+    cached     - deduped path with a warm shared cache (populated by a first, unmeasured run)
+    verbose    - deduped path with per-row debug logging (-v), its cost compared to deduped
+'''
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from fake_weather_api import FakeWeatherAPI
+
+WEATHER_MODULE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weather_module.py')
+MODES = ['sequential', 'deduped', 'concurrent', 'columnar', 'cached', 'verbose']
+# country aliases the fake API resolves to the same location, only LocationResolver can merge them
+COUNTRY_ALIASES = {'United Kingdom': 'UK', 'US': 'USA'}
+
+
+def generate_csv(path, rows, duplicate_ratio, variant_ratio=0.0, alias_ratio=0.0, invalid_ratio=0.0, seed=0):
+    '''
+    Write a csv of rows locations where duplicate_ratio of the rows repeat an earlier location.
+    variant_ratio of the rows are written as a case/spacing variant of their location, which build_query folds,
+    and alias_ratio with a country alias, which only LocationResolver merges through the coordinates returned by
+    the API. invalid_ratio of the rows lack a country, so every mode also goes through rows it cannot enrich.
+    Returns the number of unique locations and of unique queries (alias variants counted separately).
+    '''
+    rng = random.Random(seed)
+    unique = max(int(rows * (1 - duplicate_ratio)), 1)
+    locations = [('United Kingdom', '', f'City {i}', '') if i % 2 else ('US', f'State {i % 50}', '', f'{10000 + i}')
+                 for i in range(unique)]
+    written_locations, written_queries = set(), set()
+    with open(path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['country', 'state', 'city', 'zip code'])
+        for i in range(rows):
+            location = locations[i] if i < unique else rng.choice(locations)
+            row = location
+            if rng.random() < alias_ratio:
+                row = (COUNTRY_ALIASES[row[0]],) + row[1:]
+            if rng.random() < variant_ratio:
+                row = tuple(f' {value.upper()} ' if value else value for value in row)
+            if rng.random() < invalid_ratio:
+                row = ('',) + row[1:]
+            else:
+                written_locations.add(location)
+                written_queries.add(', '.join(value.strip().lower() for value in row if value.strip()))
+            writer.writerow(row)
+    return len(written_locations), len(written_queries)
+
+
+def run_mode(mode, input_path, api_url, workers, work_dir):
+    '''
+    Run weather_module.py in mode and return its wall time and peak RSS in MB (None where not measurable).
+    '''
+    save_path = tempfile.mkdtemp(dir=work_dir)
+    command = [sys.executable, WEATHER_MODULE, '-ip', input_path, '-sp', save_path, '-apik', 'benchmark',
+               '-su', api_url, '-mf', os.path.join(save_path, 'metrics.json')]
+    if mode == 'sequential':
+        command += ['--no-dedup']
+    elif mode == 'concurrent':
+        command += ['-w', str(workers)]
+    elif mode == 'columnar':
+        command += ['--columnar']
+    elif mode == 'cached':
+        command += ['-sc', os.path.join(work_dir, 'warm_cache.sqlite')]
+    elif mode == 'verbose':
+        command += ['-v']
+
+    log_path = os.path.join(save_path, 'run.log')
+    started = time.perf_counter()
+    with open(log_path, 'w') as log_file:
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=log_file,
+                                   cwd=os.path.dirname(WEATHER_MODULE))
+        peak_mb = None
+        if hasattr(os, 'wait4'):
+            # rusage of the child (and its waited-for workers), ru_maxrss is in KB on Linux
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_mb = round(rusage.ru_maxrss / 1024, 1)
+        else:
+            process.wait()
+    elapsed = time.perf_counter() - started
+    if process.returncode:
+        with open(log_path) as log_file:
+            raise RuntimeError(f'{mode} run failed:\n{log_file.read()[-2000:]}')
+    return elapsed, peak_mb
+
+
+def benchmark(args):
+    work_dir = tempfile.mkdtemp(prefix='weather_benchmark_')
+    input_path = os.path.join(work_dir, 'input.csv')
+    unique, unique_queries = generate_csv(input_path, args.rows, args.duplicate_ratio, args.variant_ratio,
+                                          args.alias_ratio, args.invalid_ratio)
+
+    fake_api = FakeWeatherAPI(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    api_url = fake_api.start()
+    results = []
+    try:
+        for mode in args.modes:
+            if mode == 'cached':  # warm the shared cache first
+                run_mode(mode, input_path, api_url, args.workers, work_dir)
+            fake_api.reset()
+            elapsed, peak_mb = run_mode(mode, input_path, api_url, args.workers, work_dir)
+            results.append({'mode': mode, 'rows': args.rows, 'unique_locations': unique, 'unique_queries': unique_queries,
+                            'seconds': round(elapsed, 3), 'rows_per_s': round(args.rows / elapsed, 1),
+                            'peak_rss_mb': peak_mb, 'api_calls': fake_api.calls, 'api_errors': fake_api.errors})
+    finally:
+        fake_api.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    columns = ['mode', 'rows', 'unique_locations', 'unique_queries', 'seconds', 'rows_per_s', 'peak_rss_mb', 'api_calls', 'api_errors']
+    print(' | '.join(f'{col:>16}' for col in columns))
+    for result in results:
+        print(' | '.join(f'{str(result[col]):>16}' for col in columns))
+
+
+def args_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rows", dest="rows", type=int, default=100000,
+                        help="Rows in the synthetic input csv")
+    parser.add_argument("-d", "--duplicate-ratio", dest="duplicate_ratio", type=float, default=0.9,
+                        help="Share of rows repeating an earlier location")
+    parser.add_argument("-vr", "--variant-ratio", dest="variant_ratio", type=float, default=0.0,
+                        help="Share of rows written as a case/spacing variant of their location")
+    parser.add_argument("-ar", "--alias-ratio", dest="alias_ratio", type=float, default=0.2,
+                        help="Share of rows written with a country alias (UK, USA) which only LocationResolver merges")
+    parser.add_argument("-ir", "--invalid-ratio", dest="invalid_ratio", type=float, default=0.01,
+                        help="Share of rows without a country, which are written out without weather")
+    parser.add_argument("-l", "--latency-ms", dest="latency_ms", type=float, default=20,
+                        help="Latency of the fake API per call")
+    parser.add_argument("-e", "--error-rate", dest="error_rate", type=float, default=0.0,
+                        help="Share of fake API calls failing with HTTP 500")
+    parser.add_argument("-m", "--modes", dest="modes", nargs='+', choices=MODES, default=MODES)
+    parser.add_argument("-w", "--workers", dest="workers", type=int, default=os.cpu_count() or 2,
+                        help="Processes for the sharded mode")
+    parser.add_argument("-o", "--output", dest="output", default=None,
+                        help="Path to save the results as JSON")
+    return parser.parse_args()
+
+# command line example
+# python benchmark_weather.py -r 200000 -d 0.95 -l 30 -e 0.01 -m deduped columnar cached -o results.json
+# logging overhead: deduped (quiet) against verbose on the same input
+# python benchmark_weather.py -r 100000 -m deduped verbose
+
+
+if __name__ == '__main__':
+    args = args_parser()
+    results = benchmark(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
@@ -0,0 +1,114 @@
+'''
+Local stub of WeatherAPI's current.json for benchmarks.
+Responds with a deterministic location and current weather for any query after a configurable latency, and fails
+a configurable share of requests with HTTP 500. GET /stats returns the number of calls received.
+Country aliases (e.g. "uk" and "united kingdom") resolve to the same location, like the real geocoder, so queries
+which only LocationResolver can merge can be generated.
+'''
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# alias -> country name the fake geocoder resolves it to
+COUNTRY_ALIASES = {'uk': 'united kingdom', 'gb': 'united kingdom', 'usa': 'us', 'united states': 'us'}
+
+
+class FakeWeatherAPI:
+    def __init__(self, latency_ms=50, jitter_ms=10, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.server = None
+
+    def response(self, query):
+        '''
+        Deterministic response for query, variants differing only in case, spacing or country alias map to the
+        same location.
+        '''
+        parts = [' '.join(part.split()) for part in query.lower().split(',') if part.strip()]
+        parts = [COUNTRY_ALIASES.get(part, part) for part in parts]
+        digest = int(hashlib.md5(', '.join(parts).encode()).hexdigest(), 16)
+        return {
+            'location': {'name': parts[-1].title(), 'region': 'Region', 'country': parts[0].title(),
+                         'lat': round(digest % 18000 / 100 - 90, 2), 'lon': round(digest // 18000 % 36000 / 100 - 180, 2),
+                         'localtime': '2026-10-19 10:00'},
+            'current': {'last_updated': '2026-10-19 09:45', 'temp_c': digest % 400 / 10 - 10, 'temp_f': 50.0,
+                        'cloud': digest % 100, 'wind_mph': digest % 300 / 10, 'humidity': digest % 100,
+                        'pressure_mb': 1000.0 + digest % 40},
+        }
+
+    def start(self, host='127.0.0.1', port=0):
+        '''
+        Serve in a background thread, port 0 picks a free port. Returns the current.json url.
+        '''
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f'http://{host}:{self.server.server_address[1]}/current.json'
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+
+    def _handler(self):
+        api = self
+
+        class FakeWeatherHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/stats':
+                    return self._send(200, {'calls': api.calls, 'errors': api.errors})
+                if url.path != '/current.json':
+                    return self._send(404, {'error': 'unknown path'})
+
+                with api._lock:
+                    api.calls += 1
+                    failed = api.random.random() < api.error_rate
+                    delay = max(api.latency_ms + api.random.uniform(-api.jitter_ms, api.jitter_ms), 0) / 1000
+                    if failed:
+                        api.errors += 1
+                time.sleep(delay)
+                if failed:
+                    return self._send(500, {'error': {'code': 9999, 'message': 'Internal application error.'}})
+                return self._send(200, api.response(parse_qs(url.query).get('q', [''])[0]))
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return FakeWeatherHandler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--port", dest="port", type=int, default=8766)
+    parser.add_argument("-l", "--latency-ms", dest="latency_ms", type=float, default=50)
+    parser.add_argument("-e", "--error-rate", dest="error_rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fake_api = FakeWeatherAPI(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    print(f'Fake Weather API on {fake_api.start(port=args.port)}')
+    threading.Event().wait()
@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+
+
+class TrackedLines:
+    '''
+    Iterate over the decoded lines of a file opened in binary mode while keeping track of the byte offset
+    of the next unread line, so a csv reader fed from it can be resumed with file.seek(offset).
+    '''
+    def __init__(self, binary_file, encoding='utf-8'):
+        self.file = binary_file
+        self.encoding = encoding
+        self.offset = binary_file.tell()
+
+    def seek(self, offset):
+        self.file.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        for line in self.file:
+            self.offset += len(line)
+            if self.offset == len(line):  # first line of the file may carry a byte order mark
+                yield line.decode('utf-8-sig' if self.encoding == 'utf-8' else self.encoding)
+            else:
+                yield line.decode(self.encoding)
+
+
+class Checkpoint:
+    '''
+    Progress record of a weather job, stored as JSON next to the output files.
+    Records the input byte offset and row index matching the end of every flushed output chunk.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.logger = self._setup_logger()
+
+    def load(self):
+        '''
+        Return the last saved progress, or None if there is no checkpoint.
+        '''
+        try:
+            with open(self.path, 'r') as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        self.logger.info(f"Resuming from checkpoint at row {state['row_index']}")
+        return state
+
+    def save(self, **state):
+        '''
+        Atomically replace the checkpoint so a crash mid-write never leaves a corrupt record.
+        '''
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(tmp_path, self.path)
+        self.logger.debug(f"Checkpoint saved at row {state.get('row_index')}")
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for Checkpoint.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('Checkpoint')
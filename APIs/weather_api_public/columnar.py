@@ -0,0 +1,108 @@
+'''
+Columnar enrichment path for FetchWeather.
+The input csv is read in chunks with pandas, queries are built with vectorised string operations, every unique
+uncached query in a chunk is fetched once and the results are joined back onto the chunk by query key before the
+chunk is written in bulk. Only one chunk is held in memory at a time.
+'''
+
+import pandas as pd
+from WeatherApiClient import RelevantLocationData, RelevantCurrentData, TemperatureAPIFields
+
+API_LOCATION_FIELDS = RelevantLocationData.APILOCATIONFIELDS
+
+
+class ColumnarWeatherPipeline:
+    '''
+    Chunked, vectorised equivalent of FetchWeather.main producing the same output columns.
+    Parsed API fields are cached per canonical location in weather_cache, a dict of
+    location key -> {csv column: value}, see LocationResolver.
+    '''
+    def __init__(self, fetch_weather, chunk_size=100000):
+        self.fetch_weather = fetch_weather
+        self.chunk_size = chunk_size
+        self.weather_cache = {}
+
+    def run(self, writer):
+        '''
+        Enrich the input chunk by chunk, writing every chunk in bulk through writer (see output_writers).
+        '''
+        rows = 0
+        reader = pd.read_csv(self.fetch_weather.csv_path, dtype=str, keep_default_na=False,
+                             chunksize=self.chunk_size)
+        for chunk in reader:
+            writer.write_frame(self.enrich(chunk))
+            rows += len(chunk)
+            self.fetch_weather.metrics.row_done(len(chunk))
+        return rows
+
+    def enrich(self, chunk):
+        '''
+        Return the chunk with the output columns of FetchWeather, filled from the API where the query is valid.
+        '''
+        locations = pd.DataFrame({loc: chunk[loc].str.strip() for loc in RelevantLocationData.ALLORIGINALLOCATIONKEYS})
+        queries = self.build_queries(locations)
+        unique_queries = queries.dropna().unique()
+        self.fetch_missing(unique_queries)
+        # resolve every unique query once, invalid rows stay NaN and join onto no weather
+        resolver = self.fetch_weather.resolver
+        location_keys = queries.map({query: resolver.cache_key(query) for query in unique_queries})
+
+        # join cached API fields onto rows by query key
+        weather = pd.DataFrame.from_dict(self.weather_cache, orient='index', dtype=object) # keep API types as is
+        weather = weather.reindex(columns=[col for col in self.fetch_weather.csv_columns
+                                           if col not in RelevantLocationData.ALLORIGINALLOCATIONKEYS]
+                                          + list(API_LOCATION_FIELDS.values()))
+        joined = weather.reindex(location_keys.values)
+        joined.index = chunk.index
+
+        output = pd.DataFrame(index=chunk.index)
+        for col in self.fetch_weather.csv_columns:
+            if col in API_LOCATION_FIELDS:
+                from_api = joined[API_LOCATION_FIELDS[col]]
+                output[col] = locations[col].mask((locations[col] == '') & from_api.notna(), from_api)
+            elif col in locations:
+                output[col] = locations[col]
+            else:
+                output[col] = joined[col]
+        return output
+
+    @staticmethod
+    def build_queries(locations):
+        '''
+        Vectorised WeatherAPIClient.build_query: missing (None/NaN) where the row lacks a country and a city or zipcode.
+        '''
+        valid = ((locations[RelevantLocationData.COUNTRY] != '') &
+                 ((locations[RelevantLocationData.ZIPCODE] != '') | (locations[RelevantLocationData.CITY] != '')))
+        joined = pd.Series('', index=locations.index)
+        for loc in RelevantLocationData.ALLORIGINALLOCATIONKEYS:
+            joined = joined + locations[loc].mask(locations[loc] != '', locations[loc] + ', ')
+        queries = joined.str[:-2].str.lower()
+        return queries.where(valid, None)
+
+    def fetch_missing(self, queries):
+        '''
+        Fetch and parse every query that is not cached yet, once.
+        '''
+        for query in queries:
+            if self.fetch_weather.resolver.cache_key(query) in self.weather_cache:
+                self.fetch_weather.metrics.cache_hit()
+                continue
+            raw_data, location_key = self.fetch_weather.fetch_query(query)
+            if raw_data is not None:
+                self.weather_cache[location_key] = self.parse_api_fields(raw_data)
+
+    def parse_api_fields(self, raw_data):
+        '''
+        Columnar equivalent of FetchWeather.parse_raw_data for the fields taken from the API.
+        '''
+        fetch_weather = self.fetch_weather
+        parsed = {api_field: raw_data['location'][api_field] for api_field in API_LOCATION_FIELDS.values()}
+        parsed[RelevantLocationData.LOCALTIME] = raw_data['location'][RelevantLocationData.LOCALTIME]
+        if fetch_weather.temp_unit_lower == 'k':
+            parsed[fetch_weather.temp_col] = raw_data['current'][TemperatureAPIFields.temperature_mapping['c']] + 273.15
+        else:
+            parsed[fetch_weather.temp_col] = raw_data['current'][
+                TemperatureAPIFields.temperature_mapping[fetch_weather.temp_unit_lower]]
+        for current, csv_col in zip(RelevantCurrentData.ALLCURRENTKEYS, RelevantCurrentData.ALLCURRENTCSVCOLS):
+            parsed[csv_col] = raw_data['current'][current]
+        return parsed
@@ -0,0 +1,62 @@
+import logging
+import re
+
+
+class LocationResolver:
+    '''
+    Maps query variants to the provider's canonical location, so variants such as "london, uk" and
+    "london, united kingdom" share one weather lookup and one cache entry.
+
+    The canonical id is the "lat,lon" of the location block of the API response, which is also a valid query.
+    A variant is resolved by the first weather call made for it, so resolving costs no extra API calls, and the
+    index from variants to canonical ids is kept in the shared cache (if any) so later runs and other workers
+    start with every variant already resolved.
+    '''
+    def __init__(self, shared_cache=None):
+        self.shared_cache = shared_cache
+        self.index = {}  # query variant -> canonical id
+        self.logger = self._setup_logger()
+
+    @staticmethod
+    def normalise(query):
+        '''
+        Fold variants which only differ in spacing, punctuation or empty components.
+        '''
+        parts = [re.sub(r'[^\w\s-]', '', part).split() for part in query.lower().split(',')]
+        return ', '.join(' '.join(words) for words in parts if words)
+
+    def cache_key(self, query):
+        '''
+        Return the canonical id of query if it has been resolved, otherwise the normalised query itself.
+        '''
+        variant = self.normalise(query)
+        if variant not in self.index and self.shared_cache:
+            canonical = self.shared_cache.get_location(variant)
+            if canonical:
+                self.index[variant] = canonical
+        return self.index.get(variant, variant)
+
+    def learn(self, query, raw_data):
+        '''
+        Record the canonical location of query from the location block of its API response.
+        Returns the canonical id.
+        '''
+        location = raw_data['location']
+        canonical = f"{location['lat']},{location['lon']}"
+        variant = self.normalise(query)
+        if self.index.get(variant) != canonical:
+            self.index[variant] = canonical
+            if self.shared_cache:
+                self.shared_cache.set_location(variant, canonical)
+            self.logger.debug(f"Resolved '{variant}' to {location['name']} ({canonical})")
+        return canonical
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for LocationResolver.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('LocationResolver')
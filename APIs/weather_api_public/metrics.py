@@ -0,0 +1,149 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+
+class LatencyHistogram:
+    '''
+    Fixed log-scale histogram of latencies in seconds, from 1ms to about 2 minutes.
+    Memory stays constant however many samples are recorded, and histograms of several workers can be merged.
+    '''
+    BOUNDS = [0.001 * 1.25 ** i for i in range(53)]
+
+    def __init__(self, counts=None):
+        self.counts = counts or [0] * (len(self.BOUNDS) + 1)
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def percentile(self, p):
+        '''
+        Upper bound of the bucket holding the p-th percentile (0-100), None if there are no samples.
+        '''
+        total = sum(self.counts)
+        if not total:
+            return None
+        threshold = total * p / 100
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return self.BOUNDS[min(i, len(self.BOUNDS) - 1)]
+
+
+class RunMetrics:
+    '''
+    Aggregate metrics of a weather enrichment run: rows, API calls, cache hits, upstream latency and errors by type.
+    Thread safe. report() logs them as JSON at most every interval seconds and final_report() at the end.
+    '''
+    def __init__(self, interval=30):
+        self.interval = interval
+        self.logger = self._setup_logger()
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self.rows = 0
+        self.api_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.errors = Counter()
+        self.latency = LatencyHistogram()
+
+    def row_done(self, count=1):
+        with self._lock:
+            self.rows += count
+        self.report()
+
+    def cache_hit(self, count=1):
+        with self._lock:
+            self.cache_hits += count
+
+    def cache_miss(self, count=1):
+        with self._lock:
+            self.cache_misses += count
+
+    def api_call(self, seconds, error=None):
+        '''
+        Record one upstream call, its latency and, if it failed, the error type.
+        '''
+        with self._lock:
+            self.api_calls += 1
+            self.latency.record(seconds)
+            if error:
+                self.errors[error] += 1
+
+    def error(self, error_type):
+        with self._lock:
+            self.errors[error_type] += 1
+
+    def merge(self, state):
+        '''
+        Add the state() of another RunMetrics, e.g. of a sharded worker.
+        '''
+        with self._lock:
+            self.rows += state['rows']
+            self.api_calls += state['api_calls']
+            self.cache_hits += state['cache_hits']
+            self.cache_misses += state['cache_misses']
+            self.errors.update(state['errors'])
+            self.latency.merge(LatencyHistogram(state['latency_counts']))
+
+    def state(self):
+        '''
+        Picklable raw counters, to send to another process.
+        '''
+        with self._lock:
+            return {'rows': self.rows, 'api_calls': self.api_calls, 'cache_hits': self.cache_hits,
+                    'cache_misses': self.cache_misses, 'errors': dict(self.errors),
+                    'latency_counts': list(self.latency.counts)}
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'elapsed_s': round(elapsed, 3),
+                'rows': self.rows,
+                'rows_per_s': round(self.rows / elapsed, 2),
+                'api_calls': self.api_calls,
+                'api_calls_per_s': round(self.api_calls / elapsed, 2),
+                'cache_hit_ratio': round(self.cache_hits / lookups, 4) if lookups else None,
+                'latency_p50_s': self.latency.percentile(50),
+                'latency_p95_s': self.latency.percentile(95),
+                'latency_p99_s': self.latency.percentile(99),
+                'errors': dict(self.errors),
+            }
+
+    def report(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        self.logger.info(json.dumps(self.snapshot()))
+
+    def final_report(self, path=None):
+        '''
+        Log the final metrics and, if path is given, save them as JSON.
+        '''
+        snapshot = self.snapshot()
+        self.logger.info(json.dumps(snapshot))
+        if path:
+            with open(path, 'w') as metrics_file:
+                json.dump(snapshot, metrics_file, indent=2)
+        return snapshot
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for RunMetrics.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('RunMetrics')
@@ -0,0 +1,159 @@
+'''
+Pluggable output writers for FetchWeather.
+Every writer takes rows as dicts (writerow) or pandas chunks (write_frame), writes them through a bounded buffer
+and is closed with close() or by using it as a context manager.
+'''
+
+import csv
+import gzip
+from WeatherApiClient import RelevantLocationData, RelevantCurrentData, RelevantHourData
+
+
+class OutputFormats:
+    CSV = 'csv'
+    CSV_GZIP = 'csv.gz'
+    CSV_ZSTD = 'csv.zst'
+    PARQUET = 'parquet'
+    ALLFORMATS = [CSV, CSV_GZIP, CSV_ZSTD, PARQUET]
+
+
+class OutputWriter:
+    '''
+    Base class of the output writers.
+    '''
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = fieldnames
+
+    def writerow(self, row):
+        raise NotImplementedError
+
+    def write_frame(self, frame):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CsvOutputWriter(OutputWriter):
+    '''
+    CSV writer, uncompressed or compressed with gzip or zstd (zstandard package needed for zstd).
+    '''
+    def __init__(self, path, fieldnames, compression=None):
+        super().__init__(path, fieldnames)
+        if compression == 'gzip':
+            self.file = gzip.open(path, mode='wt', newline='', compresslevel=6)
+        elif compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('zstd output needs the zstandard package: pip install zstandard')
+            self.file = zstandard.open(path, mode='wt', newline='')
+        else:
+            self.file = open(path, mode='w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+
+    def write_frame(self, frame):
+        frame.to_csv(self.file, header=False, index=False)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutputWriter(OutputWriter):
+    '''
+    Parquet writer with typed columns: localtime and last updated as timestamps, temperature and the current
+    weather measurements as floats, location columns as strings.
+    Rows are buffered and written one row group at a time, so memory is bounded by row_group_size.
+    '''
+    TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M' # format of WeatherAPI local times
+    TIMESTAMP_COLUMNS = [RelevantLocationData.LOCALTIME, 'Last Updated', RelevantHourData.TIMECSVCOL]
+
+    def __init__(self, path, fieldnames, temp_col, row_group_size=100000):
+        super().__init__(path, fieldnames)
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('parquet output needs the pyarrow package: pip install pyarrow')
+        self.pa, self.pc = pa, pc
+        self.row_group_size = row_group_size
+        self.float_columns = [temp_col] + [col for col in RelevantCurrentData.ALLCURRENTCSVCOLS
+                                           if col not in self.TIMESTAMP_COLUMNS]
+        self.schema = pa.schema([(col, self._column_type(col)) for col in fieldnames])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.buffer = {col: [] for col in fieldnames}
+        self.buffered_rows = 0
+
+    def writerow(self, row):
+        for col in self.fieldnames:
+            self.buffer[col].append(row.get(col))
+        self.buffered_rows += 1
+        if self.buffered_rows >= self.row_group_size:
+            self.flush()
+
+    def write_frame(self, frame):
+        self.flush()
+        self.writer.write_table(self._table({col: frame[col].tolist() for col in self.fieldnames}))
+
+    def flush(self):
+        if not self.buffered_rows:
+            return
+        self.writer.write_table(self._table(self.buffer))
+        self.buffer = {col: [] for col in self.fieldnames}
+        self.buffered_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def _column_type(self, col):
+        if col in self.TIMESTAMP_COLUMNS:
+            return self.pa.timestamp('s')
+        if col in self.float_columns:
+            return self.pa.float64()
+        return self.pa.string()
+
+    def _table(self, columns):
+        arrays = []
+        for col in self.fieldnames:
+            values = [None if self._is_missing(value) else value for value in columns[col]]
+            if col in self.TIMESTAMP_COLUMNS:
+                strings = self.pa.array([None if value is None else str(value) for value in values], self.pa.string())
+                arrays.append(self.pc.strptime(strings, format=self.TIMESTAMP_FORMAT, unit='s', error_is_null=True))
+            elif col in self.float_columns:
+                arrays.append(self.pa.array([None if value is None else float(value) for value in values],
+                                            self.pa.float64()))
+            else:
+                arrays.append(self.pa.array([None if value is None else str(value) for value in values],
+                                            self.pa.string()))
+        return self.pa.Table.from_arrays(arrays, schema=self.schema)
+
+    @staticmethod
+    def _is_missing(value):
+        # empty csv fields and pandas NaN are both missing values
+        return value is None or value == '' or value != value
+
+
+def build_writer(output_format, path, fieldnames, temp_col):
+    '''
+    Return the writer for output_format writing to path.
+    '''
+    if output_format == OutputFormats.PARQUET:
+        return ParquetOutputWriter(path, fieldnames, temp_col)
+    if output_format == OutputFormats.CSV_GZIP:
+        return CsvOutputWriter(path, fieldnames, compression='gzip')
+    if output_format == OutputFormats.CSV_ZSTD:
+        return CsvOutputWriter(path, fieldnames, compression='zstd')
+    return CsvOutputWriter(path, fieldnames)
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class QuotaExhaustedError(Exception):
+    '''
+    Raised when the monthly quota of the API key has been used up.
+    '''
+
+
+class RateLimitDefaults:
+    SAFETY_MARGIN = 0.9 # plan to use 90% of the allowed rate so we stay just under the limit
+    THROTTLE_BACKOFF = 60 # seconds to hold off after a 429 without a Retry-After header
+
+
+class RateLimiter:
+    '''
+    Token bucket rate limiter with a monthly quota ledger.
+
+    The bucket refills at a planned rate just under the per-minute limit, so calls are paced instead of
+    bouncing off 429s. Every call is recorded in a monthly ledger and the job stops once the quota is used up.
+
+    Threads share the limiter through a lock. Processes share it through a JSON state file guarded by a file lock,
+    so every process using the same state_path draws from the same bucket and the same monthly ledger.
+    '''
+    def __init__(self, per_minute=None, per_month=None, state_path=None, safety_margin=RateLimitDefaults.SAFETY_MARGIN):
+        self.per_minute = per_minute
+        self.per_month = per_month
+        self.state_path = state_path
+        self.safety_margin = safety_margin
+        self.logger = self._setup_logger()
+        self._thread_lock = threading.Lock()
+        self._state = None # in memory state when no state file is used
+
+    def acquire(self):
+        '''
+        Block until a call is allowed, then record it in the ledger.
+        Raises QuotaExhaustedError if the monthly quota has been used up.
+        '''
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                self._refill(state, now)
+                if self.per_month is not None and state['month_used'] >= self.per_month:
+                    raise QuotaExhaustedError(f"Monthly quota of {self.per_month} calls used for {state['month']}")
+
+                wait = max(state['hold_until'] - now, 0)
+                if not wait and state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    state['month_used'] += 1
+                    return
+                if not wait:
+                    wait = (1 - state['tokens']) / self.planned_rate()
+            self.logger.debug(f'Rate limit reached, waiting {wait:.2f}s')
+            time.sleep(wait)
+
+    def throttled(self, retry_after=None):
+        '''
+        Record a 429 from the API. Empties the bucket and holds off every thread/process sharing the limiter.
+        '''
+        backoff = float(retry_after) if retry_after else RateLimitDefaults.THROTTLE_BACKOFF
+        with self._locked_state() as state:
+            state['tokens'] = 0
+            state['hold_until'] = max(state['hold_until'], time.time() + backoff)
+        self.logger.warning(f'API throttled the key, holding off for {backoff}s')
+
+    def planned_rate(self):
+        '''
+        Calls per second which keep the job just under the per-minute limit.
+        The monthly quota is not spread out, it is a ledger that stops the job once it has been used up.
+        '''
+        if self.per_minute is None:
+            return float('inf')
+        return self.per_minute * self.safety_margin / 60
+
+    def plan(self, expected_calls):
+        '''
+        Plan the throughput of a job that expects to make expected_calls API calls.
+        Returns the planned calls per second and the estimated duration in seconds, and warns if the job
+        does not fit in the remaining monthly quota.
+        '''
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            rate = self.planned_rate()
+            remaining = None if self.per_month is None else max(self.per_month - state['month_used'], 0)
+
+        if remaining is not None and expected_calls > remaining:
+            self.logger.warning(f'Job expects {expected_calls} calls but only {remaining} remain in the monthly quota')
+        duration = expected_calls / rate if rate != float('inf') else 0
+        self.logger.info(f'Planned throughput: {rate * 60:.1f} calls/min, estimated duration {duration:.0f}s')
+        return {'calls_per_second': rate, 'estimated_seconds': duration, 'remaining_quota': remaining}
+
+    def _refill(self, state, now):
+        '''
+        Add the tokens accumulated since the last refill, resetting the ledger when a new month starts.
+        '''
+        month = datetime.now().strftime('%Y-%m')
+        if state['month'] != month:
+            state['month'] = month
+            state['month_used'] = 0
+
+        if self.per_minute is None:
+            state['tokens'] = 1.0
+        else:
+            # a bucket of at most one second of calls keeps bursts from tripping the per-minute limit
+            rate = self.planned_rate()
+            capacity = max(rate, 1)
+            state['tokens'] = min(capacity, state['tokens'] + (now - state['last_refill']) * rate)
+        state['last_refill'] = now
+
+    @staticmethod
+    def _new_state():
+        return {'tokens': 1.0, 'last_refill': time.time(), 'hold_until': 0.0,
+                'month': datetime.now().strftime('%Y-%m'), 'month_used': 0}
+
+    @contextmanager
+    def _locked_state(self):
+        '''
+        Yield the shared state under the thread lock and, if a state file is used, the file lock.
+        Changes made to the state are saved on exit.
+        '''
+        with self._thread_lock:
+            if self.state_path is None:
+                if self._state is None:
+                    self._state = self._new_state()
+                yield self._state
+                return
+
+            with open(self.state_path + '.lock', 'a+') as lock_file:
+                self._lock_file(lock_file)
+                try:
+                    state = self._read_state()
+                    yield state
+                    self._write_state(state)
+                finally:
+                    self._unlock_file(lock_file)
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, 'r') as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._new_state()
+
+    def _write_state(self, state):
+        tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _lock_file(lock_file):
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+
+    @staticmethod
+    def _unlock_file(lock_file):
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for RateLimiter.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('RateLimiter')
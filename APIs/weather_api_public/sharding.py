@@ -0,0 +1,105 @@
+'''
+Sharded execution of FetchWeather for very large input files.
+The input csv is split into byte ranges aligned to line boundaries, every shard is processed by its own
+FetchWeather in a process pool and the shard outputs are merged in input order.
+NOTE: Shard boundaries are aligned to physical lines, so input rows must not contain quoted line breaks.
+'''
+
+import csv
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from checkpoint import TrackedLines
+from output_writers import OutputFormats
+
+logger = logging.getLogger('Sharding')
+
+
+def shard_boundaries(csv_path, n_shards):
+    '''
+    Split the rows of csv_path (after the header) into n_shards byte ranges which start on a line boundary.
+    Returns the header fieldnames and a list of (start, end) offsets.
+    '''
+    with open(csv_path, mode='rb') as csv_file:
+        lines = TrackedLines(csv_file)
+        fieldnames = next(csv.reader(lines), [])
+        data_start = lines.offset
+        file_size = os.path.getsize(csv_path)
+
+        offsets = [data_start]
+        for i in range(1, n_shards):
+            csv_file.seek(data_start + (file_size - data_start) * i // n_shards)
+            csv_file.readline()  # move on to the start of the next line
+            offsets.append(max(csv_file.tell(), offsets[-1]))
+        offsets.append(file_size)
+
+    boundaries = [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+    return fieldnames, boundaries
+
+
+def process_shard(args, fieldnames, start, end, shard_path):
+    '''
+    Worker: enrich the rows starting in [start, end) with its own FetchWeather and write them,
+    without a header, to shard_path. Returns the number of rows processed and the worker's metrics.
+    '''
+    from weather_module import FetchWeather  # imported here to avoid a circular import
+
+    fetch_weather = FetchWeather(args)
+    rows = 0
+    with open(shard_path, mode='w', newline='') as shard_file:
+        writer = csv.DictWriter(shard_file, fieldnames=fetch_weather.csv_columns)
+        with open(args.INPUT_PATH, mode='rb') as csv_file:
+            lines = TrackedLines(csv_file)
+            lines.seek(start)
+            reader = csv.DictReader(lines, fieldnames=fieldnames)
+            while lines.offset < end:
+                row = next(reader, None)
+                if row is None:
+                    break
+                fetch_weather.process_row(row, writer)
+                rows += 1
+                fetch_weather.metrics.row_done()
+    return rows, fetch_weather.metrics.state()
+
+
+def run_sharded(fetch_weather, output_path):
+    '''
+    Process the input of fetch_weather in fetch_weather.args.workers processes and merge the shard outputs,
+    in order, into output_path. Shards are always plain csv, they are converted while merging if another
+    output format is requested.
+    '''
+    args = fetch_weather.args
+    fieldnames, boundaries = shard_boundaries(args.INPUT_PATH, args.workers)
+    shard_paths = [f'{output_path}.shard{i}' for i in range(len(boundaries))]
+    logger.info(f'Processing {len(boundaries)} shards in {args.workers} processes')
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(process_shard, args, fieldnames, start, end, shard_path)
+                       for (start, end), shard_path in zip(boundaries, shard_paths)]
+            rows = 0
+            for future in futures:
+                shard_rows, shard_metrics = future.result()
+                rows += shard_rows
+                fetch_weather.metrics.merge(shard_metrics)
+
+        if args.output_format == OutputFormats.CSV:
+            with open(output_path, mode='w', newline='') as output_csv_file:
+                csv.DictWriter(output_csv_file, fieldnames=fetch_weather.csv_columns).writeheader()
+                for shard_path in shard_paths:
+                    with open(shard_path, mode='r', newline='') as shard_file:
+                        shutil.copyfileobj(shard_file, output_csv_file)
+        else:
+            with fetch_weather.build_output_writer(output_path) as writer:
+                for shard_path in shard_paths:
+                    with open(shard_path, mode='r', newline='') as shard_file:
+                        for row in csv.DictReader(shard_file, fieldnames=fetch_weather.csv_columns):
+                            writer.writerow(row)
+    finally:
+        for shard_path in shard_paths:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+
+    logger.info(f'Finished {rows} rows, output saved to {output_path}')
+    return rows
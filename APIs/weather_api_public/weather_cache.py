@@ -0,0 +1,74 @@
+import json
+import logging
+import sqlite3
+import time
+
+
+class SharedWeatherCache:
+    '''
+    Cache of raw API responses keyed by query, stored in SQLite so several processes can share it.
+    Raw responses are cached rather than parsed rows, so jobs with different temperature units share entries.
+    Responses older than ttl seconds are stale and not returned, so later jobs fetch the current weather again.
+    Also holds the index of query variants to canonical locations used by LocationResolver.
+    '''
+    def __init__(self, path, ttl=600, timeout=30):
+        self.path = path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.logger = self._setup_logger()
+        self._connection = None
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')  # readers do not block the writer
+            connection.execute('CREATE TABLE IF NOT EXISTS responses '
+                               '(query TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS locations (query TEXT PRIMARY KEY, location_id TEXT NOT NULL)')
+
+    def get(self, query, max_age=None):
+        '''
+        Return the cached raw response for query, or None if it has not been fetched or is stale.
+        max_age overrides ttl for this lookup, None for ttl and float('inf') for responses that never go stale.
+        '''
+        max_age = self.ttl if max_age is None else max_age
+        row = self._connect().execute('SELECT response FROM responses WHERE query = ? AND fetched_at >= ?',
+                                      (query, time.time() - max_age)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, query, raw_data):
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO responses (query, response, fetched_at) VALUES (?, ?, ?)',
+                               (query, json.dumps(raw_data), time.time()))
+
+    def get_location(self, query):
+        row = self._connect().execute('SELECT location_id FROM locations WHERE query = ?', (query,)).fetchone()
+        return row[0] if row else None
+
+    def set_location(self, query, location_id):
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO locations (query, location_id) VALUES (?, ?)',
+                               (query, location_id))
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self):
+        # connections cannot cross processes, so each process opens its own lazily
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        return self._connection
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for SharedWeatherCache.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('SharedWeatherCache')
@@ -4,65 +4,281 @@ import csv
 import os
 from datetime import datetime
 from WeatherApiClient import WeatherAPIClient, RelevantLocationData, RelevantCurrentData, TemperatureAPIFields
+from rate_limiter import RateLimiter
+from checkpoint import Checkpoint, TrackedLines
+from weather_cache import SharedWeatherCache
+from location_resolver import LocationResolver
+from sharding import run_sharded
+from metrics import RunMetrics
+from output_writers import OutputFormats, build_writer
 
 
 class FetchWeather:
 
-    def __init__(self):
-        self.args = self.args_parser()
+    def __init__(self, args=None):
+        self.args = args or self.args_parser() # sharded workers are built from the parent's parsed arguments
         self.csv_path = self.args.INPUT_PATH
         self.output_path = self.args.SAVE_FILE_BASE_PATH
         self.api_key = self.args.API_KEY
-        self.api_client = WeatherAPIClient(self.api_key)
+        self.rate_limiter = self.build_rate_limiter()
+        self.metrics = RunMetrics(interval=self.args.metrics_interval)
+        self.api_client = WeatherAPIClient(self.api_key, rate_limiter=self.rate_limiter, url=self.args.service_url,
+                                           metrics=self.metrics)
         self.temp_unit = self.args.temperature_unit
         self.logger = self._setup_logger()
+        if self.args.verbose:
+            logging.getLogger().setLevel(logging.DEBUG)
         self.RelevantLocationData = RelevantLocationData()
         self.RelevantCurrentData = RelevantCurrentData()
         self.TemperatureAPIFieldsMapping = TemperatureAPIFields.temperature_mapping
         self.csv_columns = self.RelevantLocationData.ALLLOCATIONKEYS + self.RelevantCurrentData.ALLCURRENTCSVCOLS # keeps order
         self.temperature_unit_column()
         self.cache = {}
+        self.shared_cache = SharedWeatherCache(self.args.shared_cache, ttl=self.args.cache_ttl) if self.args.shared_cache else None
+        self.resolver = LocationResolver(self.shared_cache) # caches are keyed by canonical location
 
     def main(self):
         '''
         Main function to process csv.
-        Use DictReader rather than pd.read_csv as we want an iterator to iterate through each row in the csv
+        Use a csv reader rather than pd.read_csv as we want an iterator to iterate through each row in the csv
         in case of large files to preserve memory (scalable).
+        The input is read in binary mode so the byte offset of every row is known, and a checkpoint is saved
+        with every flushed output chunk. With --resume the job continues from the last checkpoint.
         '''
-        now = datetime.now().strftime("%Y_%m_%dT%H_%M_%S")
-        output_path = os.path.join(self.output_path,f'output_weather_file_{now}.csv')
-        with open(output_path, mode='w', newline='') as output_csv_file:
+        if self.rate_limiter and not self.args.backfill:
+            self.rate_limiter.plan(self.expected_calls())
+        if self.args.backfill:
+            return self.main_backfill()
+        if self.args.columnar:
+            return self.main_columnar()
+        if self.args.workers > 1:
+            return self.main_sharded()
+        if self.args.output_format != OutputFormats.CSV:
+            return self.main_formatted()
+
+        checkpoint = Checkpoint(os.path.join(self.output_path,
+                                             f'{os.path.basename(self.csv_path)}.checkpoint.json'))
+        state = checkpoint.load() if self.args.resume else None
+        if self.args.resume and state is None:
+            self.logger.info('No checkpoint found, starting from the beginning')
+        if state:
+            self.validate_checkpoint(state)
+            output_path = state['output_path']
+            with open(output_path, mode='r+b') as output_csv_file:
+                output_csv_file.truncate(state['output_offset'])  # drop rows written after the last checkpoint
+        else:
+            output_path = self.new_output_path()
+
+        with open(output_path, mode='a' if state else 'w', newline='') as output_csv_file:
             writer = csv.DictWriter(output_csv_file, fieldnames=self.csv_columns)
+            if not state:
+                writer.writeheader()
+
+            with open(self.csv_path, mode='rb') as csv_file:
+                lines = TrackedLines(csv_file)
+                fieldnames = next(csv.reader(lines), [])
+                row_index = 0
+                if state:
+                    lines.seek(state['input_offset'])
+                    row_index = state['row_index']
+                reader = csv.DictReader(lines, fieldnames=fieldnames)
 
-            # Write the header row first
-            writer.writeheader()
-            with open(self.csv_path, mode='r', newline='') as csv_file:
-                reader = csv.DictReader(csv_file)
                 for row in reader:
-                    raw_data, original_data, query = self.fetch_data(row)
-                    if query in self.cache:
-                        parsed = self.cache[query]
-                        self.logger.info(f'Repeated Location, take data from cache {parsed}')
-                    elif query is None: # invalid csv row or API response
-                        writer.writerow(original_data)
-                        continue
-                    else:
-                        parsed = self.parse_raw_data(raw_data, original_data, query)
-                    writer.writerow(parsed)
+                    self.process_row(row, writer)
+                    row_index += 1
+                    self.metrics.row_done()
+                    if row_index % self.args.checkpoint_every == 0:
+                        self.save_checkpoint(checkpoint, output_csv_file, output_path, lines.offset, row_index)
+
+        checkpoint.remove()
+        self.logger.info(f'Finished {row_index} rows, output saved to {output_path}')
+        self.metrics.final_report(self.args.metrics_file)
+
+    def main_sharded(self):
+        '''
+        Split the input csv into shards processed in parallel processes, then merge the outputs in order.
+        Every worker has its own client, but they share the rate limiter state file and the SQLite cache.
+        '''
+        if self.args.resume:
+            raise ValueError('--resume is not supported with --workers, rerun the sharded job instead')
+        rows = run_sharded(self, self.new_output_path())
+        self.metrics.final_report(self.args.metrics_file)
+        return rows
+
+    def main_columnar(self):
+        '''
+        Optional faster path for millions of rows: read the csv in chunks with pandas, join cached results onto
+        each chunk by query key and write every chunk in bulk. Memory stays bounded by --chunk-size.
+        '''
+        from columnar import ColumnarWeatherPipeline  # pandas is only needed for this path
 
+        if self.args.resume or self.args.workers > 1 or self.args.no_dedup:
+            raise ValueError('--columnar does not support --resume, --workers or --no-dedup')
+        output_path = self.new_output_path()
+        with self.build_output_writer(output_path) as writer:
+            rows = ColumnarWeatherPipeline(self, chunk_size=self.args.chunk_size).run(writer)
+        self.logger.info(f'Finished {rows} rows, output saved to {output_path}')
+        self.metrics.final_report(self.args.metrics_file)
+        return rows
+
+    def main_backfill(self):
+        '''
+        Enrich every row with the historical/forecast weather at the hour of its own timestamp.
+        Rows are grouped by (location, date) per chunk, so API calls scale with unique location-days.
+        '''
+        from backfill import WeatherBackfill
+
+        # weather_service only serves current.json, history and forecast calls must go to the API
+        if (self.args.resume or self.args.workers > 1 or self.args.columnar or self.args.no_dedup
+                or self.args.service_url):
+            raise ValueError('--backfill does not support --resume, --workers, --columnar, --no-dedup or --service-url')
+        backfill = WeatherBackfill(self, timestamp_column=self.args.timestamp_column, chunk_size=self.args.chunk_size)
+        self.csv_columns = backfill.csv_columns
+        output_path = self.new_output_path()
+        with self.build_output_writer(output_path) as writer:
+            rows = backfill.run(writer)
+        self.logger.info(f'Finished {rows} rows, output saved to {output_path}')
+        self.metrics.final_report(self.args.metrics_file)
+        return rows
+
+    def main_formatted(self):
+        '''
+        Row by row processing for the compressed csv and parquet output formats.
+        Compressed outputs cannot be truncated back to a checkpoint, so they do not support --resume.
+        '''
+        if self.args.resume:
+            raise ValueError(f'--resume is only supported with the {OutputFormats.CSV} output format')
+        output_path = self.new_output_path()
+        rows = 0
+        with self.build_output_writer(output_path) as writer:
+            with open(self.csv_path, mode='r', newline='') as csv_file:
+                for row in csv.DictReader(csv_file):
+                    self.process_row(row, writer)
+                    rows += 1
+                    self.metrics.row_done()
+        self.logger.info(f'Finished {rows} rows, output saved to {output_path}')
+        self.metrics.final_report(self.args.metrics_file)
+        return rows
+
+    def new_output_path(self):
+        now = datetime.now().strftime("%Y_%m_%dT%H_%M_%S")
+        return os.path.join(self.output_path, f'output_weather_file_{now}.{self.args.output_format}')
+
+    def build_output_writer(self, output_path):
+        return build_writer(self.args.output_format, output_path, self.csv_columns, self.temp_col)
+
+    def process_row(self, row, writer):
+        '''
+        Fetch, parse and write a single csv row.
+        '''
+        raw_data, original_data, location_key = self.fetch_data(row)
+        if location_key in self.cache and not self.args.no_dedup:
+            # cached row may come from another variant of the location, keep this row's own location data
+            parsed = {**self.cache[location_key], **{loc: val for loc, val in original_data.items() if val}}
+            self.logger.debug('Repeated Location, take data from cache %s', parsed)
+        elif location_key is None: # invalid csv row or API response
+            writer.writerow(original_data)
+            return
+        else:
+            parsed = self.parse_raw_data(raw_data, original_data, location_key)
+        writer.writerow(parsed)
+
+    def save_checkpoint(self, checkpoint, output_csv_file, output_path, input_offset, row_index):
+        '''
+        Flush the output chunk to disk, then record how far into the input and output files the job has got.
+        '''
+        output_csv_file.flush()
+        os.fsync(output_csv_file.fileno())
+        checkpoint.save(input_path=os.path.abspath(self.csv_path),
+                        output_path=os.path.abspath(output_path),
+                        temp_col=self.temp_col,
+                        input_offset=input_offset,
+                        output_offset=os.path.getsize(output_path),
+                        row_index=row_index)
+
+    def validate_checkpoint(self, state):
+        '''
+        A checkpoint can only be resumed by the same input file and temperature unit that created it.
+        '''
+        if state['input_path'] != os.path.abspath(self.csv_path) or state['temp_col'] != self.temp_col:
+            raise ValueError(f"Checkpoint was created for {state['input_path']} with {state['temp_col']}, "
+                             f"cannot resume with {self.csv_path} and {self.temp_col}")
 
     def fetch_data(self, csv_row):
         '''
         Use client to fetch raw data from API.
+        Returns the canonical location key of the row, which variants of the same location share.
         '''
         query, original_data = self.api_client.build_query(csv_row)
-        if query is None or query in self.cache: # invalid csv data or in cache
-            return None, original_data, query
+        if query is None: # invalid csv data
+            return None, original_data, None
+        location_key = self.resolver.cache_key(query)
+        if location_key in self.cache and not self.args.no_dedup:
+            self.metrics.cache_hit()
+            return None, original_data, location_key
+
+        raw_data, location_key = self.fetch_query(query)
+        if raw_data is None: # failed API response
+            return None, original_data, None
+        return raw_data, original_data, location_key
+
+    def fetch_query(self, query):
+        '''
+        Fetch the raw data for a built query, from the shared cache if another job or worker already fetched it.
+        Returns the raw data and the canonical location key, raw data is None if the API call failed.
+        '''
+        location_key = self.resolver.cache_key(query)
+        if self.shared_cache and not self.args.no_dedup:
+            raw_data = self.shared_cache.get(location_key)
+            if raw_data is not None:
+                self.metrics.cache_hit()
+                return raw_data, location_key
 
+        self.metrics.cache_miss()
         raw_data, query = self.api_client.fetch_weather(query)
-        if query is None: # failed API response
-            return None, original_data, query
-        return raw_data, original_data, query
+        if query is None:
+            return None, location_key
+        location_key = self.resolver.learn(query, raw_data)
+        if self.shared_cache:
+            self.shared_cache.set(location_key, raw_data)
+        return raw_data, location_key
+
+    def expected_calls(self):
+        '''
+        Number of API calls the job expects to make: the unique locations of the input which are not cached yet.
+        Reads the input once without fetching anything, so the quota can be checked before the job starts.
+        '''
+        valid_rows = 0
+        variants = set()
+        with open(self.csv_path, mode='r', newline='') as csv_file:
+            for query, _ in map(self.api_client.build_query, csv.DictReader(csv_file)):
+                if query:
+                    valid_rows += 1
+                    variants.add(self.resolver.normalise(query))
+        if self.args.no_dedup:
+            return valid_rows
+        location_keys = {self.resolver.cache_key(variant) for variant in variants}
+        if self.shared_cache:
+            location_keys = {key for key in location_keys if self.shared_cache.get(key) is None}
+        self.logger.info(f'{len(variants)} unique locations in the input, {len(location_keys)} to fetch')
+        return len(location_keys)
+
+    def build_rate_limiter(self):
+        '''
+        Build a rate limiter from CLI arguments if the API key has quotas.
+        Jobs pointing at the same state file share one token bucket and one monthly quota ledger.
+        The monthly ledger has to outlive the job to track the month's usage, so it is kept in a state file
+        under the save path unless another one is given.
+        '''
+        if (self.args.requests_per_minute is None and self.args.requests_per_month is None
+                and self.args.rate_state_file is None):
+            return None
+        if (self.args.workers > 1 or self.args.requests_per_month is not None) and self.args.rate_state_file is None:
+            # workers are separate processes and the monthly ledger must survive the job, both need a state file
+            self.args.rate_state_file = os.path.join(self.args.SAVE_FILE_BASE_PATH, 'rate_state.json')
+        return RateLimiter(per_minute=self.args.requests_per_minute,
+                           per_month=self.args.requests_per_month,
+                           state_path=self.args.rate_state_file)
 
     def temperature_unit_column(self):
         '''
@@ -77,7 +293,7 @@ class FetchWeather:
             self.temp_col = "Temperature (C)"
         self.csv_columns.append(self.temp_col)
 
-    def parse_raw_data(self, raw_data, original_data, query):
+    def parse_raw_data(self, raw_data, original_data, location_key):
         '''
         Parse the raw data from the API call to return what is relevant.
         Return location data if not in csv
@@ -105,9 +321,9 @@ class FetchWeather:
         for current, csv_col in zip(self.RelevantCurrentData.ALLCURRENTKEYS,self.RelevantCurrentData.ALLCURRENTCSVCOLS):
             parsed_data[csv_col] = raw_data['current'][current]
 
-        # ensure variations of same query will be identified if repeated
-        self.cache[query] = parsed_data
-        self.logger.info(f'Successfully parsed data')
+        # ensure variations of same location will be identified if repeated
+        self.cache[location_key] = parsed_data
+        self.logger.debug('Successfully parsed data')
 
         return parsed_data
 
@@ -141,11 +357,119 @@ class FetchWeather:
                             help="Decide which temperature unit to use",
                             choices=['C','c', 'F', 'f', 'K', 'k'],
                             default='C')
+        parser.add_argument("-rpm", "--requests-per-minute",
+                            dest="requests_per_minute",
+                            help="Per-minute quota of the API key, calls are paced to stay just under it",
+                            type=int,
+                            default=None)
+        parser.add_argument("-rpmo", "--requests-per-month",
+                            dest="requests_per_month",
+                            help="Monthly quota of the API key, the job stops once it is used up. Usage is tracked "
+                                 "across jobs in the rate state file (rate_state.json in the save path by default)",
+                            type=int,
+                            default=None)
+        parser.add_argument("-rsf", "--rate-state-file",
+                            dest="rate_state_file",
+                            help="Path to a state file shared by parallel jobs so they draw from the same quota "
+                                 "example: r'C:/Users/weather_data/rate_state.json'",
+                            default=None)
+        parser.add_argument("-r", "--resume",
+                            dest="resume",
+                            help="Continue from the last checkpoint of this input file instead of starting again",
+                            action="store_true")
+        parser.add_argument("-ce", "--checkpoint-every",
+                            dest="checkpoint_every",
+                            help="Number of rows per flushed output chunk and checkpoint",
+                            type=int,
+                            default=1000)
+        parser.add_argument("-w", "--workers",
+                            dest="workers",
+                            help="Number of processes, more than 1 splits the input csv into shards processed in parallel",
+                            type=int,
+                            default=1)
+        parser.add_argument("-sc", "--shared-cache",
+                            dest="shared_cache",
+                            help="Path to a SQLite cache of API responses shared between workers and jobs "
+                                 "example: r'C:/Users/weather_data/weather_cache.sqlite'",
+                            default=None)
+        parser.add_argument("-cttl", "--cache-ttl",
+                            dest="cache_ttl",
+                            help="Seconds a response in the shared cache stays fresh, older ones are fetched again",
+                            type=int,
+                            default=600)
+
+        parser.add_argument("-nd", "--no-dedup",
+                            dest="no_dedup",
+                            help="Fetch every row from the API even if its location was already fetched "
+                                 "(baseline for benchmarks)",
+                            action="store_true")
+
+        parser.add_argument("-col", "--columnar",
+                            dest="columnar",
+                            help="Process the csv in chunks with pandas instead of row by row (faster for large files)",
+                            action="store_true")
+        parser.add_argument("-cs", "--chunk-size",
+                            dest="chunk_size",
+                            help="Rows per chunk in columnar and backfill modes",
+                            type=int,
+                            default=100000)
+
+        parser.add_argument("-of", "--output-format",
+                            dest="output_format",
+                            help="Output file format, parquet has typed columns and csv.gz/csv.zst are compressed",
+                            choices=OutputFormats.ALLFORMATS,
+                            default=OutputFormats.CSV)
+
+        parser.add_argument("-su", "--service-url",
+                            dest="service_url",
+                            help="Fetch through a shared local weather_service instead of calling the API directly "
+                                 "example: 'http://127.0.0.1:8765/current.json'",
+                            default=None)
+
+        parser.add_argument("-bf", "--backfill",
+                            dest="backfill",
+                            help="Fetch the historical/forecast weather at each row's timestamp instead of the current weather",
+                            action="store_true")
+        parser.add_argument("-tc", "--timestamp-column",
+                            dest="timestamp_column",
+                            help="Column holding the ISO 8601 event timestamp of each row in backfill mode",
+                            default='timestamp')
+        parser.add_argument("-mi", "--metrics-interval",
+                            dest="metrics_interval",
+                            help="Seconds between periodic metrics reports (rows/s, API calls/s, cache hit ratio, "
+                                 "latency percentiles, errors)",
+                            type=float,
+                            default=30)
+        parser.add_argument("-mf", "--metrics-file",
+                            dest="metrics_file",
+                            help="Path to save the final metrics of the run as JSON",
+                            default=None)
+        parser.add_argument("-v", "--verbose",
+                            dest="verbose",
+                            help="Log every row (debug level)",
+                            action="store_true")
 
-        return parser.parse_args()
+        args = parser.parse_args()
+        if args.workers > 1 and args.shared_cache is None:
+            args.shared_cache = os.path.join(args.SAVE_FILE_BASE_PATH, 'weather_cache.sqlite')
+        return args
 
 # command line example
 # python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" -tu "k"
+# resume a job that died halfway through
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" -tu "k" --resume
+# sharded over 8 processes for very large files
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" -w 8
+# columnar mode for millions of rows
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" --columnar -cs 200000
+# parquet output with typed columns
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" -of parquet
+# backfill the weather at each row's own timestamp
+# python weather_module.py -ip "C:\Users\example_events.csv" -sp "C:\Users\weather_data" -apik "abcde" --backfill -tc "event_time"
+# through a shared weather_service (see weather_service.py)
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "unused" -su "http://127.0.0.1:8765/current.json"
+# with quotas shared between parallel jobs
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "abcde" -rpm 100 -rpmo 1000000 -rsf "C:\Users\weather_data\rate_state.json"
 
 
 
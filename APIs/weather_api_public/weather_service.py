@@ -0,0 +1,220 @@
+'''
+Local weather service shared by many pipeline jobs.
+Serves GET /current.json?q=<query> with the same response as WeatherAPI, so a job only has to point its client
+at the service (weather_module.py --service-url). Concurrent requests for the same location are coalesced into
+a single upstream fetch (single-flight) and responses are kept in a warm in-memory cache with TTL eviction.
+GET /stats returns the service counters as JSON.
+'''
+
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from WeatherApiClient import WeatherAPIClient
+from location_resolver import LocationResolver
+from rate_limiter import RateLimiter
+
+
+class TTLCache:
+    '''
+    Thread safe in-memory cache whose entries expire after ttl seconds.
+    The least recently used entries are evicted once max_entries is reached.
+    '''
+    def __init__(self, ttl=600, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class WeatherService:
+    '''
+    Single-flight, cached front of a WeatherAPIClient.
+    '''
+    def __init__(self, api_client, ttl=600, max_entries=100000):
+        self.api_client = api_client
+        self.cache = TTLCache(ttl, max_entries)
+        self.resolver = LocationResolver()
+        self.logger = self._setup_logger()
+        self._inflight = {} # location key -> Future of the upstream fetch
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream_calls': 0, 'upstream_errors': 0}
+
+    def get_weather(self, query):
+        '''
+        Return the raw API response for query, or None if the upstream call failed.
+        '''
+        location_key = self.resolver.cache_key(query)
+        with self._lock:
+            self.stats['requests'] += 1
+            raw_data = self.cache.get(location_key)
+            if raw_data is not None:
+                self.stats['cache_hits'] += 1
+                return raw_data
+            future = self._inflight.get(location_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[location_key] = future
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            raw_data, _ = self.api_client.fetch_weather(query)
+            with self._lock:
+                self.stats['upstream_calls'] += 1
+                if raw_data is None:
+                    self.stats['upstream_errors'] += 1
+            if raw_data is not None:
+                self.cache.set(self.resolver.learn(query, raw_data), raw_data)
+            future.set_result(raw_data)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[location_key]
+        return raw_data
+
+    def serve(self, host='127.0.0.1', port=8765):
+        server = ThreadingHTTPServer((host, port), self._handler())
+        server.daemon_threads = True
+        self.logger.info(f'Weather service listening on http://{host}:{port}')
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+    def _handler(self):
+        service = self
+
+        class WeatherRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/stats':
+                    return self._send(200, dict(service.stats, cached_locations=len(service.cache)))
+                if url.path != '/current.json':
+                    return self._send(404, {'error': 'unknown path'})
+                query = parse_qs(url.query).get('q', [''])[0].strip()
+                if not query:
+                    return self._send(400, {'error': 'missing q parameter'})
+                try:
+                    raw_data = service.get_weather(query)
+                except Exception as e:
+                    return self._send(503, {'error': str(e)})
+                if raw_data is None:
+                    return self._send(502, {'error': f"upstream error for query '{query}'"})
+                return self._send(200, raw_data)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                service.logger.debug(format % args)
+
+        return WeatherRequestHandler
+
+    def _setup_logger(self):
+        '''
+        Initialize and configure logger for WeatherService.
+        '''
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        return logging.getLogger('WeatherService')
+
+
+def args_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-apik", "--api-key",
+                        dest="API_KEY",
+                        help="Personal API Key for Weather API",
+                        required=True)
+    parser.add_argument("--host",
+                        dest="host",
+                        help="Interface to listen on",
+                        default='127.0.0.1')
+    parser.add_argument("-p", "--port",
+                        dest="port",
+                        help="Port to listen on",
+                        type=int,
+                        default=8765)
+    parser.add_argument("-ttl", "--cache-ttl",
+                        dest="cache_ttl",
+                        help="Seconds a cached response stays fresh",
+                        type=int,
+                        default=600)
+    parser.add_argument("-rpm", "--requests-per-minute",
+                        dest="requests_per_minute",
+                        help="Per-minute quota of the API key, upstream calls are paced to stay just under it",
+                        type=int,
+                        default=None)
+    parser.add_argument("-rpmo", "--requests-per-month",
+                        dest="requests_per_month",
+                        help="Monthly quota of the API key, usage is tracked across restarts in the rate state file",
+                        type=int,
+                        default=None)
+    parser.add_argument("-rsf", "--rate-state-file",
+                        dest="rate_state_file",
+                        help="Path to a state file shared with jobs calling the API directly so they draw from the "
+                             "same quota (rate_state.json in the current folder by default when -rpmo is set) "
+                             "example: r'C:/Users/weather_data/rate_state.json'",
+                        default=None)
+    args = parser.parse_args()
+    if args.requests_per_month is not None and args.rate_state_file is None:
+        # the monthly ledger must survive restarts of the service
+        args.rate_state_file = 'rate_state.json'
+    return args
+
+# command line example
+# python weather_service.py -apik "abcde" -p 8765 -ttl 900 -rpm 100
+# sharing the quota ledger with jobs calling the API directly
+# python weather_service.py -apik "abcde" -rpm 100 -rpmo 1000000 -rsf "C:\Users\weather_data\rate_state.json"
+# then run jobs against it
+# python weather_module.py -ip "C:\Users\example_input.csv" -sp "C:\Users\weather_data" -apik "unused" -su "http://127.0.0.1:8765/current.json"
+
+
+if __name__ == '__main__':
+    args = args_parser()
+    rate_limiter = None
+    if (args.requests_per_minute is not None or args.requests_per_month is not None
+            or args.rate_state_file is not None):
+        rate_limiter = RateLimiter(per_minute=args.requests_per_minute, per_month=args.requests_per_month,
+                                   state_path=args.rate_state_file)
+    service = WeatherService(WeatherAPIClient(args.API_KEY, rate_limiter=rate_limiter), ttl=args.cache_ttl)
+    service.serve(args.host, args.port)
@@ -0,0 +1,361 @@
+import asyncio
+import fnmatch
+import inspect
+import logging
+import time
+from web_scraper import WebScraper
+from readiness import DomQuiet
+from browser_profile import DEFAULT_BLOCKED_RESOURCES, LIGHTWEIGHT_ARGUMENTS, TRACKER_PATTERNS
+
+
+def playwright_selector(by_type, selector):
+    """Translate a Selenium (By.TYPE, "selector") locator into a Playwright selector"""
+    if by_type == "xpath":
+        return f"xpath={selector}"
+    if by_type == "id":
+        return f"#{selector}"
+    if by_type == "class name":
+        return f".{selector}"
+    if by_type == "name":
+        return f'[name="{selector}"]'
+    if by_type == "link text":
+        return f'a:text-is("{selector}")'
+    if by_type == "partial link text":
+        return f'a:has-text("{selector}")'
+    return selector  # "css selector" and "tag name"
+
+
+class AsyncWebScraper(WebScraper):
+    """
+    One tab of an AsyncBrowser with the WebScraper API
+
+    load_page, wait_and_click, scroll_to_element, refresh_soup, health_check and close are coroutines,
+    the Beautiful Soup based extraction methods (get_element_by_selector, extract_download_options, extract, ...)
+    are inherited unchanged. Create tabs with AsyncBrowser.new_tab.
+    """
+
+    def __init__(self, page, context=None, **scraper_kwargs):
+        """
+        Args:
+            page: Playwright Page of the tab
+            context: Playwright BrowserContext owned by this tab (closed with it), None if shared
+            **scraper_kwargs: WebScraper arguments (timeout, readiness, ready_timeout, parser, parse_only, page_cache)
+        """
+        self.page = page
+        self.context = context
+        super().__init__(**scraper_kwargs)
+
+    def _init_driver(self, implicit_wait):
+        """The tab is driven by Playwright, there is no Selenium driver to launch"""
+        self.page.set_default_timeout(self.timeout * 1000)
+
+    async def load_page(self, url, wait_for_element=None, wait_time=None, revalidate=False):
+        """
+        Load a web page in this tab and parse it with Beautiful Soup
+
+        Args:
+            url (str): URL to load
+            wait_for_element (tuple): Optional (By.TYPE, "selector") to wait for specific element
+            wait_time (int): Custom wait time for this request
+            revalidate (bool): Load the page even if page_cache holds a fresh copy
+
+        Returns:
+            bool: True if page loaded successfully, False otherwise
+        """
+        if not revalidate and self.load_cached(url, wait_for_element):
+            return True
+        started = time.perf_counter()
+        try:
+            self.logger.info(f"Loading page: {url}")
+            wait_until = "networkidle" if self.readiness == "network_idle" else "load"
+            with self.metrics.phase("navigate"):
+                await self.page.goto(url, wait_until=wait_until, timeout=self.ready_timeout * 1000)
+
+            if wait_for_element:
+                with self.metrics.phase("wait_element"):
+                    await self.page.wait_for_selector(playwright_selector(*wait_for_element),
+                                                      timeout=(wait_time or self.timeout) * 1000)
+                self.logger.info(f"Element {wait_for_element} found")
+
+            with self.metrics.phase("ready_wait"):
+                await self.wait_until_ready()
+
+            with self.metrics.phase("page_source"):
+                self.page_source = await self.page.content()
+            self.soup = self.parse(self.page_source)
+
+            self.pages_loaded += 1
+            self.store_cached(url, wait_for_element)
+            self.metrics.page_done(time.perf_counter() - started)
+            self.logger.info("Page loaded and parsed successfully")
+            return True
+
+        except Exception as e:
+            self.metrics.page_done(time.perf_counter() - started, ok=False)
+            self.logger.error(f"Error loading page {url}: {e}")
+            return False
+
+    async def wait_until_ready(self, condition=None, timeout=None):
+        """
+        Wait until the page is ready, see WebScraper.wait_until_ready
+
+        Args:
+            condition: 'dom_quiet', a DomQuiet instance or a predicate(page) -> bool (sync or async),
+                defaults to the one configured in __init__ ('ready_state' and 'network_idle' are handled by goto)
+            timeout (int): Custom maximum wait, defaults to ready_timeout
+        """
+        condition = condition or self.readiness
+        timeout = timeout or self.ready_timeout
+        try:
+            if condition == "dom_quiet" or isinstance(condition, DomQuiet):
+                quiet_time = condition.quiet_time if isinstance(condition, DomQuiet) else DomQuiet().quiet_time
+                await self.page.evaluate(f"() => {{ {DomQuiet.START_SCRIPT} }}")
+                await self.page.wait_for_function(f"quietMs => (() => {{ {DomQuiet.INSTALL_SCRIPT} }})() >= quietMs",
+                                                  arg=quiet_time * 1000, timeout=timeout * 1000, polling=100)
+            elif callable(condition):
+                deadline = asyncio.get_running_loop().time() + timeout
+                while True:
+                    ready = condition(self.page)
+                    if inspect.isawaitable(ready):
+                        ready = await ready
+                    if ready:
+                        break
+                    if asyncio.get_running_loop().time() > deadline:
+                        raise asyncio.TimeoutError
+                    await asyncio.sleep(0.1)
+            return True
+        except Exception:
+            self.logger.warning("Page not ready before timeout, continuing with current content")
+            return False
+
+    async def wait_and_click(self, by_type, selector, wait_time=None):
+        """
+        Wait for an element and click it (useful for dynamic content)
+
+        Returns:
+            bool: True if clicked successfully, False otherwise
+        """
+        try:
+            await self.page.click(playwright_selector(by_type, selector), timeout=(wait_time or self.timeout) * 1000)
+            self.logger.info(f"Clicked element: {selector}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error clicking element {selector}: {e}")
+            return False
+
+    async def scroll_to_element(self, css_selector):
+        """
+        Scroll to a specific element on the page
+
+        Returns:
+            bool: True if scrolled successfully, False otherwise
+        """
+        try:
+            await self.page.locator(css_selector).first.scroll_into_view_if_needed()
+            await self.wait_until_ready(DomQuiet(quiet_time=0.3), timeout=2)  # Allow time for any lazy loading
+            return True
+        except Exception as e:
+            self.logger.error(f"Error scrolling to element: {e}")
+            return False
+
+    async def refresh_soup(self):
+        """Refresh the Beautiful Soup object with current page content"""
+        self.page_source = await self.page.content()
+        self.soup = self.parse(self.page_source)
+        self.logger.info("Beautiful Soup object refreshed")
+
+    async def health_check(self):
+        """
+        Check the tab is still responsive
+
+        Returns:
+            bool: True if the page answers a trivial script, False otherwise
+        """
+        try:
+            return not self.page.is_closed() and await self.page.evaluate("1") == 1
+        except Exception as e:
+            self.logger.warning(f"Tab health check failed: {e}")
+            return False
+
+    async def close(self):
+        """Close the tab (and its context if it owns one)"""
+        if self.context:
+            await self.context.close()
+        else:
+            await self.page.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' for AsyncWebScraper")
+
+
+class AsyncBrowser:
+    """
+    One Chromium process driving many tabs from one event loop (Playwright)
+
+    Tabs are far cheaper than separate Chrome instances, so hundreds of pages can be in flight at once.
+    Each tab gets its own browser context (cookies, storage) unless isolated=False.
+    """
+
+    def __init__(self, headless=True, lightweight=False, block_resources=DEFAULT_BLOCKED_RESOURCES,
+                 block_patterns=None, isolated=True):
+        """
+        Args:
+            headless (bool): Run browser in headless mode
+            lightweight (bool): Abort requests of block_resources types, trackers and block_patterns, and
+                disable browser features the scraper does not need
+            block_resources (iterable): Playwright resource types aborted in lightweight mode
+                ('image', 'font', 'media', 'stylesheet')
+            block_patterns (list): Additional URL patterns aborted in lightweight mode ('*' wildcards)
+            isolated (bool): Give every tab its own browser context
+        """
+        self.headless = headless
+        self.lightweight = lightweight
+        self.blocked_types = set(block_resources or ()) if lightweight else set()
+        self.blocked_patterns = (TRACKER_PATTERNS + list(block_patterns or [])) if lightweight else []
+        self.isolated = isolated
+        self.playwright = None
+        self.browser = None
+        self.context = None
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self):
+        """Launch the browser"""
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            self.logger.error("playwright is not installed, install it with:")
+            self.logger.error("pip install playwright && playwright install chromium")
+            raise
+        self.playwright = await async_playwright().start()
+        args = LIGHTWEIGHT_ARGUMENTS if self.lightweight else []
+        self.browser = await self.playwright.chromium.launch(headless=self.headless, args=args)
+        self.logger.info("Chromium launched successfully")
+        return self
+
+    async def new_tab(self, **scraper_kwargs):
+        """
+        Open a tab
+
+        Args:
+            **scraper_kwargs: WebScraper arguments of the tab (timeout, readiness, parser, page_cache, ...)
+
+        Returns:
+            AsyncWebScraper: The tab
+        """
+        if self.isolated:
+            context = await self._new_context()
+        else:
+            if self.context is None:
+                self.context = await self._new_context()
+            context = self.context
+        page = await context.new_page()
+        return AsyncWebScraper(page, context=context if self.isolated else None, **scraper_kwargs)
+
+    async def _new_context(self):
+        context = await self.browser.new_context()
+        if self.blocked_types or self.blocked_patterns:
+            await context.route("**/*", self._route)
+        return context
+
+    async def _route(self, route):
+        request = route.request
+        if request.resource_type in self.blocked_types or any(
+                fnmatch.fnmatchcase(request.url, pattern) for pattern in self.blocked_patterns):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def map(self, urls, parse=None, tabs=20, wait_for_element=None, **scraper_kwargs):
+        """
+        Load every URL on up to tabs concurrent tabs and yield parsed results as they complete
+
+        Args:
+            urls (iterable): URLs to load
+            parse (callable): parse(scraper, url) called on the tab once the page is loaded (may be async),
+                defaults to extract_download_options
+            tabs (int): Maximum pages in flight
+            wait_for_element (tuple): Optional (By.TYPE, "selector") passed to load_page
+            **scraper_kwargs: WebScraper arguments of the tabs
+
+        Yields:
+            tuple: (url, result, error) where result is None and error is set if the page failed
+        """
+        idle = asyncio.Queue()
+        opened = []
+
+        async def scrape(url):
+            scraper = idle.get_nowait() if not idle.empty() else None
+            if scraper is None or not await scraper.health_check():
+                scraper = await self.new_tab(**scraper_kwargs)
+                opened.append(scraper)
+            try:
+                if not await scraper.load_page(url, wait_for_element=wait_for_element):
+                    raise RuntimeError(f"Page did not load: {url}")
+                result = parse(scraper, url) if parse else scraper.extract_download_options()
+                if inspect.isawaitable(result):
+                    result = await result
+                return url, result, None
+            except Exception as e:
+                self.logger.error(f"Failed to scrape {url}: {e}")
+                return url, None, e
+            finally:
+                idle.put_nowait(scraper)
+
+        # at most tabs pages in flight, and no new page starts while the consumer is behind
+        urls = iter(urls)
+        in_flight = set()
+        try:
+            while True:
+                for url in urls:
+                    in_flight.add(asyncio.create_task(scrape(url)))
+                    if len(in_flight) >= tabs:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    yield task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            await asyncio.gather(*(scraper.close() for scraper in opened), return_exceptions=True)
+
+    async def close(self):
+        """Close the browser"""
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.logger.info("Browser closed")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+# Example usage: many Coursera lectures on tabs of one browser
+if __name__ == "__main__":
+    async def main():
+        urls = [
+            "https://www.coursera.org/learn/machine-learning/lecture/qrxwU/decision-boundary",
+            "https://www.coursera.org/learn/machine-learning/lecture/0hpMl/cost-function-for-logistic-regression",
+        ]
+        async with AsyncBrowser(lightweight=True) as browser:
+            async for url, download_options, error in browser.map(urls, tabs=50):
+                if error:
+                    print(f"{url}: failed ({error})")
+                else:
+                    print(f"{url}: {len(download_options)} download options")
+
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Fast WebScraper startup: a cache of the resolved ChromeDriver path, and a long-lived browser service
+(Chrome with remote debugging plus a running ChromeDriver) that new WebScrapers attach to in milliseconds
+instead of launching Chrome every time.
+
+    python browser_service.py start --lightweight
+    python browser_service.py status
+    python browser_service.py stop
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from browser_profile import LIGHTWEIGHT_ARGUMENTS
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "web_scraper")
+DRIVER_CACHE_PATH = os.path.join(CACHE_DIR, "chromedriver.json")
+SERVICE_STATE_PATH = os.path.join(CACHE_DIR, "browser_service.json")
+
+CHROMEDRIVER_PATHS = [
+    "chromedriver.exe",  # Current directory
+    "chromedriver",  # Current directory (Linux/Mac)
+    os.path.join(os.getcwd(), "chromedriver.exe"),
+    "C:\\chromedriver\\chromedriver.exe",  # Common Windows location
+    "C:\\chromedriver\\chromedriver-win64\\chromedriver.exe",  # New download format
+    "C:\\chromedriver\\chromedriver-win32\\chromedriver.exe",  # 32-bit version
+    "/usr/local/bin/chromedriver",  # Common Linux location
+    "/usr/bin/chromedriver",  # Another Linux location
+]
+
+CHROME_BINARIES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+                   "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+                   "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+
+logger = logging.getLogger(__name__)
+_resolved = {}  # in-process memo of resolve_chromedriver
+
+
+def resolve_chromedriver(use_cache=True):
+    """
+    Path of the ChromeDriver executable, resolved once and cached on disk
+
+    Tries webdriver-manager, then the common install locations, then PATH. Later calls (in this process or
+    later runs) reuse the cached path as long as the file still exists.
+
+    Args:
+        use_cache (bool): False forces a new resolution (e.g. after a Chrome update broke the cached driver)
+
+    Returns:
+        str: Path of chromedriver, or None to let Selenium find it itself
+    """
+    if use_cache:
+        if "path" in _resolved:
+            return _resolved["path"]
+        try:
+            with open(DRIVER_CACHE_PATH) as cache_file:
+                path = json.load(cache_file).get("path")
+            if path and os.path.exists(path):
+                _resolved["path"] = path
+                return path
+        except (OSError, ValueError):
+            pass
+
+    path = None
+    # Method 1: Try webdriver-manager if available
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+        logger.info("Using webdriver-manager for ChromeDriver")
+    except ImportError:
+        logger.info("webdriver-manager not available, trying alternative methods")
+    except Exception as e:
+        logger.warning(f"webdriver-manager failed: {e}, trying alternative methods")
+
+    # Method 2: Try to find ChromeDriver in common locations, then in PATH
+    if not path:
+        path = next((os.path.abspath(p) for p in CHROMEDRIVER_PATHS if os.path.exists(p)), None) or shutil.which("chromedriver")
+        if path:
+            logger.info(f"Found ChromeDriver at: {path}")
+
+    _resolved["path"] = path
+    if path:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(DRIVER_CACHE_PATH, "w") as cache_file:
+                json.dump({"path": path, "resolved_at": time.time()}, cache_file)
+        except OSError as e:
+            logger.warning(f"Could not cache ChromeDriver path: {e}")
+    return path
+
+
+def forget_chromedriver():
+    """Drop the cached ChromeDriver path"""
+    _resolved.clear()
+    try:
+        os.remove(DRIVER_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def find_chrome():
+    """Path of the Chrome executable, None if it is not installed in a common location"""
+    for binary in CHROME_BINARIES:
+        path = shutil.which(binary) or (binary if os.path.exists(binary) else None)
+        if path:
+            return path
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def port_open(port, host="127.0.0.1"):
+    with socket.socket() as sock:
+        sock.settimeout(0.2)
+        return sock.connect_ex((host, port)) == 0
+
+
+class BrowserService:
+    """
+    Long-lived Chrome (remote debugging) and ChromeDriver processes shared by many WebScrapers
+
+    Both processes outlive the Python process that started them; their addresses are kept in a state file,
+    so any later scraper can attach with WebScraper(attach_to=BrowserService.running()). Each attached
+    scraper works in its own tab and closes only that tab.
+    """
+
+    def __init__(self, state_path=SERVICE_STATE_PATH):
+        self.state_path = state_path
+        self.state = None
+
+    @classmethod
+    def running(cls, state_path=SERVICE_STATE_PATH):
+        """The running service described by state_path, or None if it is not running"""
+        service = cls(state_path)
+        try:
+            with open(state_path) as state_file:
+                service.state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        return service if service.is_alive() else None
+
+    @property
+    def debugger_address(self):
+        return f"127.0.0.1:{self.state['debugging_port']}"
+
+    @property
+    def driver_url(self):
+        return f"http://127.0.0.1:{self.state['driver_port']}"
+
+    def is_alive(self):
+        return bool(self.state) and port_open(self.state["debugging_port"]) and port_open(self.state["driver_port"])
+
+    def start(self, headless=True, lightweight=False, profile_dir=None, chrome_binary=None, startup_timeout=30):
+        """
+        Launch Chrome with remote debugging and a ChromeDriver server, detached from this process
+
+        Args:
+            headless (bool): Run browser in headless mode
+            lightweight (bool): Start Chrome with the lightweight switches (see browser_profile)
+            profile_dir (str): Chrome user data directory, a temporary one if None
+            chrome_binary (str): Chrome executable, searched in common locations if None
+            startup_timeout (int): Seconds to wait for both processes to listen
+
+        Returns:
+            BrowserService: self
+        """
+        chrome = chrome_binary or os.environ.get("CHROME_BINARY") or find_chrome()
+        chromedriver = resolve_chromedriver()
+        if not chrome or not chromedriver:
+            raise RuntimeError("Chrome and ChromeDriver are required to start the browser service")
+
+        debugging_port, driver_port = free_port(), free_port()
+        profile_dir = os.path.abspath(profile_dir or tempfile.mkdtemp(prefix="web_scraper_profile_"))
+        chrome_args = [chrome, f"--remote-debugging-port={debugging_port}", f"--user-data-dir={profile_dir}",
+                       "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--window-size=1920,1080",
+                       "about:blank"]
+        if headless:
+            chrome_args.insert(1, "--headless=new")
+        if lightweight:
+            chrome_args[1:1] = LIGHTWEIGHT_ARGUMENTS
+
+        detach = {"start_new_session": True} if os.name != "nt" else {
+            "creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        chrome_process = subprocess.Popen(chrome_args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **detach)
+        driver_process = subprocess.Popen([chromedriver, f"--port={driver_port}"],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **detach)
+        self.state = {"chrome_pid": chrome_process.pid, "driver_pid": driver_process.pid,
+                      "debugging_port": debugging_port, "driver_port": driver_port, "profile_dir": profile_dir,
+                      "started_at": time.time()}
+
+        deadline = time.monotonic() + startup_timeout
+        while not self.is_alive():
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("Browser service did not start in time")
+            time.sleep(0.1)
+
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, "w") as state_file:
+            json.dump(self.state, state_file, indent=2)
+        logger.info(f"Browser service running, debugger {self.debugger_address}, driver {self.driver_url}")
+        return self
+
+    def stop(self):
+        """Terminate Chrome and ChromeDriver and remove the state file"""
+        for key in ("driver_pid", "chrome_pid"):
+            pid = (self.state or {}).get(key)
+            if pid:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        self.state = None
+
+
+def args_parser():
+    parser = argparse.ArgumentParser(description="Long-lived browser for WebScraper(attach_to=...)")
+    parser.add_argument("command", choices=["start", "stop", "status"])
+    parser.add_argument("--headed", dest="headless", action="store_false", help="Show the browser window")
+    parser.add_argument("--lightweight", action="store_true", help="Start Chrome with the lightweight switches")
+    parser.add_argument("--profile-dir", dest="profile_dir", default=None, help="Chrome user data directory")
+    parser.add_argument("--state", dest="state_path", default=SERVICE_STATE_PATH, help="Service state file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = args_parser()
+    service = BrowserService.running(args.state_path)
+    if args.command == "start":
+        if service:
+            print(f"Already running: debugger {service.debugger_address}, driver {service.driver_url}")
+        else:
+            service = BrowserService(args.state_path).start(args.headless, args.lightweight, args.profile_dir)
+            print(f"Started: debugger {service.debugger_address}, driver {service.driver_url}")
+    elif args.command == "stop":
+        if service:
+            service.stop()
+            print("Stopped")
+        else:
+            print("Not running")
+    else:
+        print(json.dumps(service.state, indent=2) if service else "Not running")
+        sys.exit(0 if service else 1)
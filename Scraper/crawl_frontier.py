@@ -0,0 +1,263 @@
+import logging
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from urllib.parse import urldefrag, urljoin, urlsplit
+from bs4 import BeautifulSoup, SoupStrainer
+from driver_pool import WebScraperPool, extract_download_options
+
+
+def extract_links(soup, base_url, follow=None):
+    """
+    Extract the absolute http(s) links of a parsed page
+
+    Args:
+        soup: BeautifulSoup of the page
+        base_url (str): URL of the page, relative links are resolved against it
+        follow: Optional regex (str or compiled) or predicate(url) -> bool a link must satisfy
+
+    Returns:
+        list: Unique links without fragments, in page order
+    """
+    if isinstance(follow, str):
+        follow = re.compile(follow)
+    if isinstance(follow, re.Pattern):
+        follow = follow.search
+    links = {}
+    for anchor in soup.find_all("a", href=True):
+        url = urldefrag(urljoin(base_url, anchor["href"].strip())).url
+        if urlsplit(url).scheme in ("http", "https") and (follow is None or follow(url)):
+            links[url] = None
+    return list(links)
+
+
+class CrawlFrontier:
+    """
+    Persistent crawl frontier: a priority queue of URLs to visit with per-host politeness
+
+    URLs are stored in SQLite, whose primary key is the seen-set, so a URL is only ever queued once and
+    millions of URLs do not have to fit in memory. A stopped crawl resumes from the same file: pages that
+    were in flight are queued again. Hosts get at most per_host_concurrency pages in flight and at least
+    per_host_delay seconds between the starts of two page loads.
+    """
+
+    PENDING, IN_PROGRESS, DONE, FAILED = "pending", "in_progress", "done", "failed"
+
+    def __init__(self, path, per_host_delay=1.0, per_host_concurrency=1, max_retries=2):
+        """
+        Open (or resume) a frontier
+
+        Args:
+            path (str): SQLite file holding the frontier, ':memory:' for a throwaway crawl
+            per_host_delay (float): Minimum seconds between two page loads on the same host
+            per_host_concurrency (int): Maximum pages in flight per host
+            max_retries (int): Times a failed page is queued again before it is marked failed
+        """
+        self.per_host_delay = per_host_delay
+        self.per_host_concurrency = per_host_concurrency
+        self.max_retries = max_retries
+        self._active = {}  # host -> pages in flight
+        self._next_start = {}  # host -> earliest time.monotonic() the next page may start
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS frontier (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL, "
+                "host TEXT NOT NULL, depth INTEGER NOT NULL, priority REAL NOT NULL, state TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (state, priority DESC, seq)")
+            resumed = self.connection.execute("UPDATE frontier SET state = ? WHERE state = ?",
+                                              (self.PENDING, self.IN_PROGRESS)).rowcount
+        if resumed:
+            self.logger.info(f"Resuming crawl, {resumed} interrupted pages queued again")
+
+    def add(self, urls, depth=0, priority=None):
+        """
+        Queue URLs which have not been seen before
+
+        Args:
+            urls (iterable): URLs to queue
+            depth (int): Link depth from the seeds
+            priority (float): Higher is visited first, defaults to -depth (breadth first)
+
+        Returns:
+            int: Number of new URLs
+        """
+        priority = -depth if priority is None else priority
+        rows = [(url, urlsplit(url).netloc.lower(), depth, priority, self.PENDING) for url in urls]
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO frontier (url, host, depth, priority, state) VALUES (?, ?, ?, ?, ?)", rows)
+            return self.connection.total_changes - before
+
+    def next(self):
+        """
+        Take the highest priority URL whose host may be visited now
+
+        Returns:
+            tuple: (url, depth), or None if no host is ready (see wait_time) or the frontier is empty
+        """
+        now = time.monotonic()
+        blocked = [host for host in set(self._active) | set(self._next_start)
+                   if self._active.get(host, 0) >= self.per_host_concurrency or self._next_start.get(host, 0) > now]
+        placeholders = ",".join("?" * len(blocked))
+        row = self.connection.execute(
+            f"SELECT url, host, depth FROM frontier WHERE state = ? AND host NOT IN ({placeholders}) "
+            "ORDER BY priority DESC, seq LIMIT 1", [self.PENDING] + blocked).fetchone()
+        if row is None:
+            return None
+        url, host, depth = row
+        with self.connection:
+            self.connection.execute("UPDATE frontier SET state = ? WHERE url = ?", (self.IN_PROGRESS, url))
+        self._active[host] = self._active.get(host, 0) + 1
+        self._next_start[host] = now + self.per_host_delay
+        return url, depth
+
+    def wait_time(self):
+        """Seconds until a host with pending URLs may be visited again (0 if one may be visited now)"""
+        now = time.monotonic()
+        waits = [start - now for host, start in self._next_start.items()
+                 if self._active.get(host, 0) < self.per_host_concurrency]
+        return max(min(waits, default=0), 0)
+
+    def done(self, url):
+        """Mark a page as visited"""
+        self._finish(url)
+        with self.connection:
+            self.connection.execute("UPDATE frontier SET state = ? WHERE url = ?", (self.DONE, url))
+
+    def failed(self, url):
+        """Queue a page again, or mark it failed once it has used up its retries"""
+        self._finish(url)
+        with self.connection:
+            self.connection.execute(
+                "UPDATE frontier SET attempts = attempts + 1, state = CASE WHEN attempts >= ? THEN ? ELSE ? END "
+                "WHERE url = ?", (self.max_retries, self.FAILED, self.PENDING, url))
+
+    def _finish(self, url):
+        host = urlsplit(url).netloc.lower()
+        self._active[host] = max(self._active.get(host, 0) - 1, 0)
+
+    def pending(self):
+        """Number of URLs waiting to be visited"""
+        return self.connection.execute("SELECT COUNT(*) FROM frontier WHERE state = ?", (self.PENDING,)).fetchone()[0]
+
+    def counts(self):
+        """Number of URLs per state"""
+        return dict(self.connection.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+
+    def close(self):
+        self.connection.close()
+
+
+class Crawler:
+    """
+    Crawl from seed URLs on a WebScraperPool, following the links the follow filter accepts
+    """
+
+    def __init__(self, frontier, pool, parse=extract_download_options, follow=None, max_depth=2, max_pages=None,
+                 priority=None):
+        """
+        Initialize the crawler
+
+        Args:
+            frontier (CrawlFrontier): Frontier to take URLs from and queue links to
+            pool (WebScraperPool): Browsers loading the pages
+            parse (callable): parse(scraper, url) result yielded for every page
+            follow: Regex or predicate(url) -> bool selecting the links to queue, None follows every link
+            max_depth (int): Links of pages at this depth are not followed
+            max_pages (int): Stop after this many pages in this run
+            priority (callable): Optional priority(url, depth) -> float, defaults to breadth first
+        """
+        self.frontier = frontier
+        self.pool = pool
+        self.parse = parse
+        self.follow = follow
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.priority = priority
+        self.logger = logging.getLogger(__name__)
+
+    def crawl(self, seeds=()):
+        """
+        Crawl until the frontier is empty or max_pages pages were visited
+
+        Args:
+            seeds (iterable): URLs to start from (ignored if already seen, so resuming is safe)
+
+        Yields:
+            tuple: (url, result, error) where result is None and error is set if the page failed
+        """
+        self._queue(seeds, 0)
+        in_flight = {}
+        visited = 0
+        try:
+            while True:
+                while len(in_flight) < self.pool.size and (self.max_pages is None or visited + len(in_flight) < self.max_pages):
+                    taken = self.frontier.next()
+                    if taken is None:
+                        break
+                    url, depth = taken
+                    in_flight[self.pool.submit(url, self._visit)] = (url, depth)
+
+                if not in_flight:
+                    if self.frontier.pending() == 0 or (self.max_pages is not None and visited >= self.max_pages):
+                        break
+                    time.sleep(self.frontier.wait_time() or 0.05)  # every pending host is cooling down
+                    continue
+
+                finished, _ = wait(in_flight, timeout=self.frontier.wait_time() or None, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    url, depth = in_flight.pop(future)
+                    visited += 1
+                    try:
+                        result, links = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Failed to crawl {url}: {e}")
+                        self.frontier.failed(url)
+                        yield url, None, e
+                        continue
+                    if depth < self.max_depth:
+                        self._queue(links, depth + 1)
+                    self.frontier.done(url)
+                    yield url, result, None
+        finally:
+            for future, (url, _) in in_flight.items():  # stopped early, in flight pages are retried on resume
+                future.cancel()
+
+    def _visit(self, scraper, url):
+        """Runs on a pool worker: parse the loaded page and extract its links"""
+        soup = scraper.soup
+        if scraper.parse_only is not None:  # the strained soup may have dropped the links, parse them on their own
+            soup = BeautifulSoup(scraper.page_source, scraper.parser, parse_only=SoupStrainer("a"))
+        return self.parse(scraper, url), extract_links(soup, url, self.follow)
+
+    def _queue(self, urls, depth):
+        if self.priority is None:
+            return self.frontier.add(urls, depth)
+        new = 0
+        for url in urls:
+            new += self.frontier.add([url], depth, self.priority(url, depth))
+        return new
+
+
+# Example usage: walk a Coursera course catalog, resumable from coursera_crawl.sqlite
+if __name__ == "__main__":
+    from scraper_metrics import ScraperMetrics
+
+    frontier = CrawlFrontier("coursera_crawl.sqlite", per_host_delay=2.0, per_host_concurrency=2)
+    metrics = ScraperMetrics()
+    with WebScraperPool(size=2, lightweight=True, metrics=metrics) as pool:
+        crawler = Crawler(frontier, pool, follow=r"^https://www\.coursera\.org/(learn|browse)/", max_depth=3)
+        for url, download_options, error in crawler.crawl(["https://www.coursera.org/browse/data-science"]):
+            if not error:
+                print(f"{url}: {len(download_options)} download options")
+    print(frontier.counts())
+    metrics.final_report("crawl_metrics.json")
+    frontier.close()
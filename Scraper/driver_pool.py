@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from web_scraper import WebScraper
+
+
+def extract_download_options(scraper, url):
+    """Default page parser of the pool: download options of a Coursera video page"""
+    return scraper.extract_download_options()
+
+
+class WebScraperPool:
+    """
+    Pool of N headless browsers loading pages in parallel
+
+    Each worker thread owns one WebScraper (Selenium drivers are not thread safe), reuses it across pages,
+    checks its health before every page and recycles it after recycle_after pages to keep memory in check.
+    """
+
+    def __init__(self, size=4, recycle_after=50, scraper_class=WebScraper, **scraper_kwargs):
+        """
+        Initialize the pool, browsers are launched lazily by the worker threads
+
+        Args:
+            size (int): Number of browsers (and worker threads)
+            recycle_after (int): Restart a browser after this many pages
+            scraper_class: WebScraper or a subclass of it (e.g. HybridScraper to skip the browser for static pages)
+            **scraper_kwargs: Arguments passed to every WebScraper (headless, lightweight, profile_dir, ...)
+        """
+        self.size = size
+        self.recycle_after = recycle_after
+        self.scraper_class = scraper_class
+        self.scraper_kwargs = scraper_kwargs
+        self._local = threading.local()
+        self._scrapers = []
+        self._lock = threading.Lock()
+        # one long lived executor, so worker threads (and their browsers) are reused across map() calls
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='scraper')
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def map(self, urls, parse=extract_download_options, wait_for_element=None, max_in_flight=None):
+        """
+        Load every URL on the pool and yield parsed results as they complete (not in input order)
+
+        URLs are submitted in a window of max_in_flight, so a slow consumer (e.g. a blocked ResultSink) holds
+        the pool back instead of completed pages piling up in memory.
+
+        Args:
+            urls (iterable): URLs to load
+            parse (callable): parse(scraper, url) called on the worker's scraper once the page is loaded
+            wait_for_element (tuple): Optional (By.TYPE, "selector") passed to load_page
+            max_in_flight (int): Pages submitted but not yet consumed, defaults to twice the pool size
+
+        Yields:
+            tuple: (url, result, error) where result is None and error is set if the page failed
+        """
+        urls = iter(urls)
+        max_in_flight = max_in_flight or self.size * 2
+        futures = {}
+        try:
+            while True:
+                for url in islice(urls, max_in_flight - len(futures)):
+                    futures[self.submit(url, parse, wait_for_element)] = url
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    try:
+                        yield url, future.result(), None
+                    except Exception as e:
+                        self.logger.error(f"Failed to scrape {url}: {e}")
+                        yield url, None, e
+        finally:
+            for future in futures:  # consumer stopped early
+                future.cancel()
+
+    def submit(self, url, parse=extract_download_options, wait_for_element=None):
+        """
+        Load and parse one URL on the pool
+
+        Returns:
+            Future: resolves to parse(scraper, url), or raises if the page failed
+        """
+        return self._executor.submit(self._scrape, url, parse, wait_for_element)
+
+    def _scrape(self, url, parse, wait_for_element):
+        """Load and parse one page on the calling worker's scraper"""
+        scraper = self._worker_scraper()
+        if not scraper.load_page(url, wait_for_element=wait_for_element):
+            raise RuntimeError(f"Page did not load: {url}")
+        return parse(scraper, url)
+
+    def _worker_scraper(self):
+        """Return the calling thread's scraper, replacing it if it is unhealthy or has served recycle_after pages"""
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is not None:
+            if scraper.pages_loaded >= self.recycle_after:
+                self.logger.info(f"Recycling driver after {scraper.pages_loaded} pages")
+                self._discard(scraper)
+                scraper = None
+            elif not scraper.health_check():
+                self.logger.warning("Replacing unhealthy driver")
+                self._discard(scraper)
+                scraper = None
+
+        if scraper is None:
+            kwargs = dict(self.scraper_kwargs)
+            if kwargs.get('profile_dir'):
+                # a user data directory is locked by its browser, so each worker keeps its own warm profile
+                kwargs['profile_dir'] = os.path.join(kwargs['profile_dir'], threading.current_thread().name)
+            scraper = self.scraper_class(**kwargs)
+            with self._lock:
+                self._scrapers.append(scraper)
+            self._local.scraper = scraper
+        return scraper
+
+    def _discard(self, scraper):
+        with self._lock:
+            if scraper in self._scrapers:
+                self._scrapers.remove(scraper)
+        try:
+            scraper.close()
+        except Exception as e:
+            self.logger.warning(f"Error closing driver: {e}")
+
+    def close(self):
+        """Close every browser of the pool"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            scrapers, self._scrapers = self._scrapers, []
+        for scraper in scrapers:
+            try:
+                scraper.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing driver: {e}")
+
+    def __enter__(self):
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.close()
+
+
+# Example usage: crawl several Coursera lectures on 4 browsers
+if __name__ == "__main__":
+    urls = [
+        "https://www.coursera.org/learn/machine-learning/lecture/qrxwU/decision-boundary",
+        "https://www.coursera.org/learn/machine-learning/lecture/0hpMl/cost-function-for-logistic-regression",
+    ]
+    with WebScraperPool(size=4, recycle_after=100) as pool:
+        for url, download_options, error in pool.map(urls):
+            if error:
+                print(f"{url}: failed ({error})")
+            else:
+                print(f"{url}: {len(download_options)} download options")
@@ -0,0 +1,246 @@
+"""
+Declarative extraction: a spec maps field -> rule (CSS selector or tag text), is compiled once and applied
+to a page in a single walk of the tree. Rules are indexed by the id, class or tag their selector targets, so each
+element is only tested against the few rules that can match it and extraction cost stays flat as rules are added.
+"""
+
+import os
+import re
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+import soupsieve
+
+
+def last_compound(selector):
+    """Last compound of a CSS selector without its attribute and pseudo-class arguments"""
+    return re.split(r"[\s>+~]+", re.sub(r"\[.*?\]|\(.*?\)", "", selector).strip())[-1]
+
+
+def has_combinator(selector):
+    """True if a CSS selector relates several compounds (descendant, '>', '+' or '~' combinator)"""
+    return re.search(r"[\s>+~]", re.sub(r"\[.*?\]|\(.*?\)", "", selector).strip()) is not None
+
+
+def selector_tag(selector):
+    """
+    Tag name a CSS selector matches, from the last compound of the selector (e.g. 'a' for 'div.list a[href]')
+
+    Returns:
+        str: Lower case tag name, or None if the selector can match any tag
+    """
+    if "," in selector:  # a selector list can match several tags
+        return None
+    match = re.match(r"[a-zA-Z][\w-]*", last_compound(selector))
+    return match.group(0).lower() if match else None
+
+
+def selector_key(selector):
+    """
+    Most selective simple key of the last compound of a CSS selector, used to index rules
+
+    Returns:
+        tuple: ('id', name), ('class', name) or ('tag', name), or None if the selector can match any tag
+    """
+    if "," in selector:  # a selector list can match elements with different keys
+        return None
+    compound = last_compound(selector)
+    for kind, prefix in (("id", "#"), ("class", ".")):
+        match = re.search(re.escape(prefix) + r"([\w-]+)", compound)
+        if match:
+            return kind, match.group(1)
+    tag = selector_tag(selector)
+    return ("tag", tag) if tag else None
+
+
+def element_value(tag, attr, convert):
+    """Value of a matched element: its text (attr None), an attribute, or attr(tag) if attr is callable"""
+    if callable(attr):
+        value = attr(tag)
+    elif attr is None:
+        value = tag.get_text(strip=True)
+    else:
+        value = tag.get(attr)
+        if isinstance(value, list):  # multi valued attributes such as class
+            value = " ".join(value)
+    if value is None or convert is None:
+        return value
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Selector:
+    """Rule matching the elements selected by a CSS selector"""
+
+    def __init__(self, css, attr=None, multiple=False, convert=None, default=None):
+        """
+        Args:
+            css (str): CSS selector
+            attr: None for the element text, an attribute name, or a callable(tag) -> value (module level,
+                so the spec can be sent to worker processes)
+            multiple (bool): Collect every match into a list instead of the first match
+            convert (callable): Type of the value (int, float, ...), values that fail to convert become None
+            default: Value when nothing matches
+        """
+        self.css = css
+        self.attr = attr
+        self.multiple = multiple
+        self.convert = convert
+        self.default = default
+        self.key = selector_key(css)
+        self._compiled = None
+
+    def matches(self, tag):
+        if self._compiled is None:
+            self._compiled = soupsieve.compile(self.css)
+        return self._compiled.match(tag)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_compiled"] = None
+        return state
+
+
+class Text:
+    """Rule matching <tag> elements by their text, like WebScraper.get_element_by_text"""
+
+    def __init__(self, tag, text, partial=False, attr=None, multiple=False, convert=None, default=None):
+        """
+        Args:
+            tag (str): HTML tag name (e.g., 'div', 'span', 'a')
+            text (str): Text to search for in the element's own string
+            partial (bool): Match if text is contained in the string instead of equal to it
+            attr, multiple, convert, default: As for Selector
+        """
+        self.key = ("tag", tag.lower())
+        self.text = text
+        self.partial = partial
+        self.attr = attr
+        self.multiple = multiple
+        self.convert = convert
+        self.default = default
+
+    def matches(self, tag):
+        string = tag.string
+        if string is None:
+            return False
+        return self.text in string if self.partial else string == self.text
+
+
+class ExtractionSpec:
+    """
+    Compiled set of field -> rule mappings applied in one tree walk per page
+    """
+
+    def __init__(self, fields, record=None):
+        """
+        Args:
+            fields (dict): Field name -> Selector or Text rule
+            record (callable): Optional record type built as record(**fields) (dataclass, namedtuple, ...)
+        """
+        self.fields = fields
+        self.record = record
+        self.index = {}  # ('id' | 'class' | 'tag', name) -> [(field, rule)] which can match such elements
+        self.any_tag = []  # rules which can match any element
+        for field, rule in fields.items():
+            if rule.key is None:
+                self.any_tag.append((field, rule))
+            else:
+                self.index.setdefault(rule.key, []).append((field, rule))
+
+    def candidates(self, tag):
+        """Rules which can match tag, only these are tested against it"""
+        index = self.index
+        rules = index.get(("tag", tag.name), [])
+        element_id = tag.get("id")
+        if element_id:
+            rules = rules + index.get(("id", element_id), [])
+        for name in tag.get("class") or ():
+            rules = rules + index.get(("class", name), [])
+        return rules + self.any_tag if self.any_tag else rules
+
+    def extract(self, soup):
+        """
+        Apply every rule to a parsed page in a single walk of its tree
+
+        Args:
+            soup: BeautifulSoup of the page
+
+        Returns:
+            dict or record: Field values, lists for multiple rules, in document order
+        """
+        values = {field: [] if rule.multiple else None for field, rule in self.fields.items()}
+        pending = {field for field, rule in self.fields.items() if not rule.multiple}
+        for tag in soup.find_all(True):
+            for field, rule in self.candidates(tag):
+                if not rule.multiple and field not in pending:
+                    continue
+                if rule.matches(tag):
+                    value = element_value(tag, rule.attr, rule.convert)
+                    if rule.multiple:
+                        values[field].append(value)
+                    else:
+                        values[field] = value
+                        pending.discard(field)
+        for field in pending:
+            values[field] = self.fields[field].default
+        for field, rule in self.fields.items():
+            if rule.multiple and not values[field] and rule.default is not None:
+                values[field] = rule.default
+        return self.record(**values) if self.record else values
+
+    def extract_html(self, html, parser="html.parser"):
+        """Parse html and extract it, see extract"""
+        return self.extract(BeautifulSoup(html, parser))
+
+
+def _extract_batch(spec, parser, batch):
+    return [(page[0], spec.extract_html(page[1], parser)) for page in batch]
+
+
+def extract_pages(pages, spec, workers=None, parser="html.parser", chunksize=8):
+    """
+    Parse and extract many pages in a process pool
+
+    Args:
+        pages (iterable): (url, html, ...) tuples, e.g. PageCache.pages()
+        spec (ExtractionSpec): Spec applied to every page (its rules and record type must be picklable)
+        workers (int): Worker processes, defaults to the number of CPUs
+        parser (str): Beautiful Soup tree builder used by the workers
+        chunksize (int): Pages sent to a worker at a time
+
+    Yields:
+        tuple: (url, record) in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    pages = iter(pages)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # keep a bounded number of batches in flight so pages are streamed, not all loaded up front
+            while len(in_flight) < workers * 2:
+                batch = list(islice(pages, chunksize))
+                if not batch:
+                    break
+                in_flight.append(executor.submit(_extract_batch, spec, parser, batch))
+            if not in_flight:
+                return
+            yield from in_flight.popleft().result()
+
+
+def download_option(tag):
+    """Download option of a Coursera video page link, as returned by WebScraper.extract_download_options"""
+    return {
+        'text': tag.get_text(strip=True),
+        'href': tag.get('href', ''),
+        'title': tag.get('title', ''),
+        'data_attributes': {k: v for k, v in tag.attrs.items() if k.startswith('data-')}
+    }
+
+
+DOWNLOAD_OPTIONS_SPEC = ExtractionSpec({
+    'download_options': Selector('a[data-click-key*="download_video"]', attr=download_option, multiple=True),
+})
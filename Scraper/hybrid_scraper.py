@@ -0,0 +1,164 @@
+import time
+import requests
+from bs4 import SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web_scraper import WebScraper
+
+
+class HybridScraper(WebScraper):
+    """
+    WebScraper that tries a plain HTTP GET first and only uses the browser when the page needs rendering
+
+    Static pages are fetched on a pooled requests session and parsed with Beautiful Soup, without starting
+    Chrome at all. The browser is launched lazily, the first time a page is not a 2xx response (error pages,
+    bot protection) or fails the needs_rendering check,
+    and is then reused for every page that needs it. All extraction methods of WebScraper work on either path.
+    """
+
+    USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+    JS_MARKERS = ("enable javascript", "javascript is required", "you need to enable javascript")
+
+    def __init__(self, required_selectors=None, min_text_length=200, needs_rendering=None, pool_size=10,
+                 http_timeout=10, **scraper_kwargs):
+        """
+        Initialize the hybrid scraper
+
+        Args:
+            required_selectors (list): CSS selectors which must be present in the static HTML, otherwise
+                the page is rendered (e.g. the selectors extract_download_options queries)
+            min_text_length (int): Pages with less visible body text are assumed to be rendered by JavaScript
+            needs_rendering (callable): Custom check needs_rendering(response, soup) -> bool replacing the default
+            pool_size (int): Connections kept alive per host by the HTTP session
+            http_timeout (int): Timeout of the plain HTTP GET in seconds
+            **scraper_kwargs: Arguments of WebScraper used when the browser is launched
+        """
+        self.required_selectors = required_selectors or []
+        self.min_text_length = min_text_length
+        self.needs_rendering = needs_rendering or self.default_needs_rendering
+        self.http_timeout = http_timeout
+        self.http_pages = 0
+        self.rendered_pages = 0
+        self._implicit_wait = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = self.USER_AGENT
+
+        parse_only = scraper_kwargs.get("parse_only")
+        if parse_only is not None and not isinstance(parse_only, SoupStrainer):
+            # needs_rendering checks the required selectors on the strained soup, so it must keep them too
+            scraper_kwargs["parse_only"] = list(parse_only) + list(self.required_selectors)
+        super().__init__(**scraper_kwargs)
+
+    def _init_driver(self, implicit_wait):
+        """Defer launching the browser until a page needs rendering"""
+        self._implicit_wait = implicit_wait
+
+    def _ensure_driver(self):
+        if self.driver is None:
+            super()._init_driver(self._implicit_wait)
+
+    def load_page(self, url, wait_for_element=None, wait_time=None, revalidate=False, force_render=False):
+        """
+        Load a web page over plain HTTP, falling back to the browser if it needs rendering
+
+        Args:
+            url (str): URL to load
+            wait_for_element (tuple): Optional (By.TYPE, "selector") to wait for, only used when rendering
+            wait_time (int): Custom wait time for this request
+            revalidate (bool): Load the page even if page_cache holds a fresh copy
+            force_render (bool): Skip the HTTP attempt and render in the browser
+
+        Returns:
+            bool: True if page loaded successfully, False otherwise
+        """
+        if not revalidate and self.load_cached(url, wait_for_element):
+            return True
+        if self.offline:
+            self.logger.error(f"Page not cached, cannot load it offline: {url}")
+            return False
+
+        if not force_render:
+            started = time.perf_counter()
+            try:
+                with self.metrics.phase("http_fetch"):
+                    response = self.session.get(url, timeout=self.http_timeout)
+                # error pages (404, 5xx, ...) are never accepted, the browser gets its own chance at them
+                soup = self.parse(response.text) if response.ok else None
+                if soup is not None and not self.needs_rendering(response, soup):
+                    self.page_source = response.text
+                    self.soup = soup
+                    self.http_pages += 1
+                    self.pages_loaded += 1
+                    self.store_cached(url, wait_for_element)
+                    self.metrics.page_done(time.perf_counter() - started)
+                    self.logger.info(f"Loaded {url} over HTTP without rendering")
+                    return True
+                elif soup is None:
+                    self.logger.info(f"HTTP fetch of {url} returned {response.status_code}, falling back to the browser")
+                else:
+                    self.logger.info(f"{url} needs rendering, falling back to the browser")
+            except requests.RequestException as e:
+                self.logger.warning(f"HTTP fetch of {url} failed: {e}, falling back to the browser")
+
+        try:
+            self._ensure_driver()
+        except Exception as e:
+            self.logger.error(f"Cannot render {url}, browser failed to start: {e}")
+            return False
+        loaded = super().load_page(url, wait_for_element=wait_for_element, wait_time=wait_time, revalidate=True)
+        if loaded:
+            self.rendered_pages += 1
+        return loaded
+
+    def default_needs_rendering(self, response, soup):
+        """
+        Decide whether a page fetched over HTTP must be rendered by the browser
+
+        Args:
+            response: requests Response of the plain HTTP GET
+            soup: BeautifulSoup of the response
+
+        Returns:
+            bool: True if the static HTML is not enough
+        """
+        if "html" not in response.headers.get("Content-Type", "html"):
+            return False
+        if any(soup.select_one(selector) is None for selector in self.required_selectors):
+            return True
+        if self.parse_only is not None:  # the strained soup has no body text to judge by
+            return False
+        body = soup.body
+        text = body.get_text(" ", strip=True) if body else ""
+        if len(text) < self.min_text_length:
+            return True
+        return any(marker in text.lower() for marker in self.JS_MARKERS)
+
+    def refresh_soup(self):
+        """Refresh the Beautiful Soup object, only possible when the page was rendered in the browser"""
+        if self.driver:
+            super().refresh_soup()
+
+    def health_check(self):
+        """Healthy if the browser has not been launched yet, otherwise the browser must be responsive"""
+        return self.driver is None or super().health_check()
+
+    def close(self):
+        """Close the HTTP session and the browser driver if it was launched"""
+        self.session.close()
+        super().close()
+
+
+# Example usage: the lecture page needs rendering for its download links, static pages do not
+if __name__ == "__main__":
+    with HybridScraper(required_selectors=['a[data-click-key*="download_video"]']) as scraper:
+        for url in ["https://www.coursera.org/about",
+                    "https://www.coursera.org/learn/machine-learning/lecture/qrxwU/decision-boundary"]:
+            if scraper.load_page(url):
+                print(f"{url}: {len(scraper.extract_download_options())} download options")
+        print(f"HTTP pages: {scraper.http_pages}, rendered pages: {scraper.rendered_pages}")
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def render_options_key(options):
+    """Stable short hash of the options a page was rendered with (any JSON serialisable value)"""
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class PageCache:
+    """
+    Content-addressed cache of rendered pages
+
+    Entries are keyed by URL plus a hash of the render options and point to a zlib compressed page_source
+    stored once per distinct content (sha256), so identical pages under different URLs share storage.
+    Entries older than ttl seconds are stale; stale or revalidated pages are fetched again by WebScraper.
+    Safe to share between the threads of a WebScraperPool.
+    """
+
+    def __init__(self, path, ttl=None, compression_level=6):
+        """
+        Open (or create) a page cache
+
+        Args:
+            path (str): SQLite file of the cache
+            ttl (float): Seconds a page stays fresh, None keeps pages until they are revalidated
+            compression_level (int): zlib level of the stored pages
+        """
+        self.path = path
+        self.ttl = ttl
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS blobs (content_hash TEXT PRIMARY KEY, data BLOB NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, options_key TEXT NOT NULL, "
+                "content_hash TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (url, options_key))")
+
+    def get(self, url, options_key="", max_age=None):
+        """
+        Return the cached page_source of url if it is fresh
+
+        Args:
+            url (str): Page URL
+            options_key (str): Render options hash, see render_options_key
+            max_age (float): Override of ttl for this lookup
+
+        Returns:
+            tuple: (page_source, fetched_at) or None if the page is not cached or stale
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT blobs.data, pages.fetched_at FROM pages JOIN blobs USING (content_hash) "
+                "WHERE pages.url = ? AND pages.options_key = ?", (url, options_key)).fetchone()
+        if row is None:
+            return None
+        max_age = self.ttl if max_age is None else max_age
+        if max_age is not None and time.time() - row[1] > max_age:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8"), row[1]
+
+    def set(self, url, page_source, options_key=""):
+        """Store the page_source of url, replacing the previous entry"""
+        data = page_source.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone() is None:
+                self.connection.execute("INSERT INTO blobs (content_hash, data) VALUES (?, ?)",
+                                        (content_hash, zlib.compress(data, self.compression_level)))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (url, options_key, content_hash, fetched_at) VALUES (?, ?, ?, ?)",
+                (url, options_key, content_hash, time.time()))
+
+    def invalidate(self, url=None):
+        """Drop the entries of url (every entry if url is None) and the contents no entry points to anymore"""
+        with self._lock, self.connection:
+            if url is None:
+                self.connection.execute("DELETE FROM pages")
+            else:
+                self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.connection.execute("DELETE FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM pages)")
+
+    def pages(self, options_key=None):
+        """
+        Iterate over the cached pages, e.g. to re-run extraction offline
+
+        Args:
+            options_key (str): Only pages rendered with these options, None for all
+
+        Yields:
+            tuple: (url, page_source, fetched_at)
+        """
+        query = "SELECT url, options_key FROM pages" + (" WHERE options_key = ?" if options_key is not None else "")
+        with self._lock:
+            keys = self.connection.execute(query, () if options_key is None else (options_key,)).fetchall()
+        for url, key in keys:
+            cached = self.get(url, key, max_age=float("inf"))
+            if cached:
+                yield url, cached[0], cached[1]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,114 @@
+"""
+Page readiness conditions for WebScraper, usable with WebDriverWait(driver, timeout).until(condition).
+Each condition is called repeatedly with the driver and returns True once the page is ready.
+"""
+
+import json
+import time
+
+
+def document_ready(driver):
+    """Ready once the document and its subresources have loaded (document.readyState == 'complete')"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+class DomQuiet:
+    """
+    Ready once the DOM has not changed for quiet_time seconds
+
+    Installs a MutationObserver on the first call, so it also catches content rendered by JavaScript
+    after the load event (single page apps, lazy loaded lists). The quiet time counts from the start of the
+    wait (see start), so a second wait on the same page, e.g. after a scroll, does not return on old quiet.
+    """
+
+    START_SCRIPT = """
+        window.__scraperLastMutation = performance.now();
+        if (!window.__scraperObserver) {
+            window.__scraperObserver = new MutationObserver(() => { window.__scraperLastMutation = performance.now(); });
+            window.__scraperObserver.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+        }
+    """
+
+    INSTALL_SCRIPT = """
+        if (!window.__scraperObserver) {
+            window.__scraperLastMutation = performance.now();
+            window.__scraperObserver = new MutationObserver(() => { window.__scraperLastMutation = performance.now(); });
+            window.__scraperObserver.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+        }
+        return performance.now() - window.__scraperLastMutation;
+    """
+
+    def __init__(self, quiet_time=0.5):
+        self.quiet_time = quiet_time
+        self.started = False
+
+    def start(self, driver):
+        """Start a new wait: the DOM has to stay quiet for quiet_time from now"""
+        driver.execute_script(self.START_SCRIPT)
+        self.started = True
+
+    def __call__(self, driver):
+        if not self.started:
+            self.start(driver)
+        if driver.execute_script("return document.readyState") == "loading":
+            return False
+        return driver.execute_script(self.INSTALL_SCRIPT) >= self.quiet_time * 1000
+
+
+class NetworkIdle:
+    """
+    Ready once no network request has been in flight for idle_time seconds
+
+    Reads the Chrome DevTools Protocol network events from the performance log, so the driver must be started
+    with the 'goog:loggingPrefs' {'performance': 'ALL'} capability (see enable_network_events).
+    A new instance should be used for every page.
+    """
+
+    FINISHED_EVENTS = ("Network.loadingFinished", "Network.loadingFailed")
+
+    def __init__(self, idle_time=0.5):
+        self.idle_time = idle_time
+        self.inflight = set()
+        self.idle_since = None
+
+    def __call__(self, driver):
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            if method == "Network.requestWillBeSent":
+                self.inflight.add(message["params"]["requestId"])
+            elif method in self.FINISHED_EVENTS:
+                self.inflight.discard(message["params"]["requestId"])
+
+        if self.inflight or driver.execute_script("return document.readyState") != "complete":
+            self.idle_since = None
+            return False
+        if self.idle_since is None:
+            self.idle_since = time.monotonic()
+        return time.monotonic() - self.idle_since >= self.idle_time
+
+
+def enable_network_events(chrome_options):
+    """Enable the performance log NetworkIdle reads network events from"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def build_condition(readiness):
+    """
+    Build a readiness condition
+
+    Args:
+        readiness: 'ready_state', 'network_idle', 'dom_quiet' or a callable predicate(driver) -> bool
+
+    Returns:
+        callable: condition for WebDriverWait.until
+    """
+    if callable(readiness):
+        return readiness
+    if readiness == "network_idle":
+        return NetworkIdle()
+    if readiness == "dom_quiet":
+        return DomQuiet()
+    if readiness == "ready_state":
+        return document_ready
+    raise ValueError(f"Unknown readiness condition: {readiness}")
@@ -0,0 +1,187 @@
+import json
+import logging
+import queue
+import threading
+
+
+def result_record(url, result, error=None):
+    """
+    Record of one scraped page, e.g. from WebScraperPool.map: dict results are merged into the record,
+    any other result (such as the list of extract_download_options) is stored under 'result'
+    """
+    record = {"url": url}
+    if isinstance(result, dict):
+        record.update(result)
+    else:
+        record["result"] = result
+    record["error"] = str(error) if error else None
+    return record
+
+
+class ResultSink:
+    """
+    Streams records to disk in batches from a background writer thread
+
+    At most max_pending_batches full batches wait for the writer, beyond that write() blocks, which pushes
+    back on the producer (and, through WebScraperPool.map, on the fetch pool), so memory stays flat however
+    many pages are scraped. Subclasses implement _write_batch and _close_file.
+    """
+
+    def __init__(self, path, batch_size=500, max_pending_batches=4):
+        """
+        Args:
+            path (str): Output file
+            batch_size (int): Records per batched write
+            max_pending_batches (int): Full batches buffered before write() blocks
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.records_written = 0
+        self._batch = []
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        self._error = None
+        self._closed = False
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+        self._writer = threading.Thread(target=self._drain, name="result-sink", daemon=True)
+        self._writer.start()
+
+    def write(self, record):
+        """Add a record, blocks while the writer is max_pending_batches behind"""
+        if self._error:
+            raise self._error
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def write_result(self, url, result, error=None):
+        """Add the result of one page, see result_record"""
+        self.write(result_record(url, result, error))
+
+    def _drain(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            if self._error:
+                continue  # keep draining so producers never block on a failed sink
+            try:
+                self._write_batch(batch)
+                self.records_written += len(batch)
+            except Exception as e:
+                self.logger.error(f"Failed to write results to {self.path}: {e}")
+                self._error = e
+
+    def close(self):
+        """Flush the last batch, wait for the writer and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+        self._queue.put(None)
+        self._writer.join()
+        self._close_file()
+        self.logger.info(f"Wrote {self.records_written} records to {self.path}")
+        if self._error:
+            raise self._error
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _close_file(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    """One JSON object per line"""
+
+    def __init__(self, path, batch_size=500, max_pending_batches=4, append=False):
+        self._file = open(path, "a" if append else "w", encoding="utf-8", buffering=1024 * 1024)
+        super().__init__(path, batch_size, max_pending_batches)
+
+    def _write_batch(self, batch):
+        self._file.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch))
+        self._file.flush()
+
+    def _close_file(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet file with one row group per batch (requires pyarrow)
+
+    The schema is taken from the first batch unless given. Nested values (lists, dicts such as the download
+    options of a page) are stored as JSON strings unless nested_as_json is False, since their inferred types
+    usually differ from batch to batch. url and error are always strings, and so is any column which is
+    empty in the whole first batch (e.g. error when no page has failed yet), so later values still fit.
+    """
+
+    STRING_FIELDS = ("url", "error")
+
+    def __init__(self, path, batch_size=5000, max_pending_batches=4, schema=None, nested_as_json=True):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("ParquetSink requires pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.schema = schema
+        self.nested_as_json = nested_as_json
+        self._parquet_writer = None
+        super().__init__(path, batch_size, max_pending_batches)
+
+    def _write_batch(self, batch):
+        if self.nested_as_json:
+            batch = [{key: json.dumps(value, ensure_ascii=False, default=str) if isinstance(value, (list, dict)) else value
+                      for key, value in record.items()} for record in batch]
+        if self.schema is None:
+            self.schema = self._infer_schema(batch)
+        table = self._pa.Table.from_pylist(batch, schema=self.schema)
+        if self._parquet_writer is None:
+            self._parquet_writer = self._pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._parquet_writer.write_table(table)
+
+    def _infer_schema(self, batch):
+        """Schema of the first batch, with the STRING_FIELDS and all-null columns typed as strings"""
+        schema = self._pa.Table.from_pylist(batch).schema
+        for index, field in enumerate(schema):
+            if field.name in self.STRING_FIELDS or self._pa.types.is_null(field.type):
+                schema = schema.set(index, self._pa.field(field.name, self._pa.string()))
+        return schema
+
+    def _close_file(self):
+        if self._parquet_writer:
+            self._parquet_writer.close()
+
+
+def build_sink(path, **kwargs):
+    """ParquetSink for .parquet paths, JsonlSink otherwise"""
+    if path.endswith(".parquet"):
+        return ParquetSink(path, **kwargs)
+    return JsonlSink(path, **kwargs)
+
+
+# Example usage: stream download options of many lectures to disk
+if __name__ == "__main__":
+    from driver_pool import WebScraperPool
+
+    urls = [
+        "https://www.coursera.org/learn/machine-learning/lecture/qrxwU/decision-boundary",
+        "https://www.coursera.org/learn/machine-learning/lecture/0hpMl/cost-function-for-logistic-regression",
+    ]
+    with WebScraperPool(size=4) as pool, build_sink("download_options.jsonl") as sink:
+        for url, download_options, error in pool.map(urls):
+            sink.write_result(url, download_options, error)
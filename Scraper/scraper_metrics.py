@@ -0,0 +1,214 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LatencyHistogram:
+    """
+    Fixed log-scale histogram of durations in seconds, from 1ms to about 2 minutes
+    (same buckets as the weather API RunMetrics, so memory stays constant however many pages are timed)
+    """
+    BOUNDS = [0.001 * 1.25 ** i for i in range(53)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100), None if there are no samples"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        threshold = total * p / 100
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return round(self.BOUNDS[min(i, len(self.BOUNDS) - 1)], 4)
+
+
+def process_tree_rss(pid):
+    """
+    Resident memory in MB of a process and all its descendants (chromedriver -> chrome -> renderers)
+
+    Uses psutil if installed, otherwise /proc (Linux). Returns None if it cannot be measured.
+    """
+    try:
+        import psutil
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            return round(total / 1024 / 1024, 1)
+        except psutil.Error:
+            return None
+    except ImportError:
+        pass
+
+    if not os.path.isdir(f"/proc/{pid}"):
+        return None
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    stack.extend(int(child) for child in children.read().split())
+        except (OSError, ValueError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+class ScraperMetrics:
+    """
+    Where scraping time goes: per-phase timers of load_page (navigate, waits, page_source, parse, ...), driver
+    startups, page latency and Chrome memory. Thread safe, so one instance can be shared by a WebScraperPool.
+
+    Hooks registered with add_hook receive every measurement as hook(event, name, value), to export them
+    (StatsD, Prometheus, a log) as they happen; snapshot() / final_report() give the crawl summary.
+    """
+
+    def __init__(self, interval=30):
+        """
+        Args:
+            interval (int): Minimum seconds between two periodic report() logs
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self.pages = 0
+        self.failed_pages = 0
+        self.cache_hits = 0
+        self.driver_starts = 0
+        self.driver_start_seconds = 0.0
+        self.page_latency = LatencyHistogram()
+        self.phases = {}  # name -> [total seconds, count, LatencyHistogram]
+        self.rss_last_mb = None
+        self.rss_peak_mb = None
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def add_hook(self, hook):
+        """Call hook(event, name, value) on every measurement ('phase', 'page', 'driver_start', 'rss', 'cache_hit')"""
+        self._hooks.append(hook)
+
+    def _emit(self, event, name, value):
+        for hook in self._hooks:
+            try:
+                hook(event, name, value)
+            except Exception as e:
+                self.logger.warning(f"Metrics hook failed: {e}")
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def record_phase(self, name, seconds):
+        with self._lock:
+            phase = self.phases.get(name)
+            if phase is None:
+                phase = self.phases[name] = [0.0, 0, LatencyHistogram()]
+            phase[0] += seconds
+            phase[1] += 1
+            phase[2].record(seconds)
+        self._emit("phase", name, seconds)
+
+    def page_done(self, seconds, ok=True):
+        """Record one load_page call and its total latency"""
+        with self._lock:
+            if ok:
+                self.pages += 1
+            else:
+                self.failed_pages += 1
+            self.page_latency.record(seconds)
+        self._emit("page", "ok" if ok else "failed", seconds)
+        self.report()
+
+    def cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+        self._emit("cache_hit", "page_cache", 1)
+
+    def driver_started(self, seconds):
+        with self._lock:
+            self.driver_starts += 1
+            self.driver_start_seconds += seconds
+        self._emit("driver_start", "chrome", seconds)
+
+    def sample_rss(self, pid):
+        """
+        Sample the memory of the browser process tree rooted at pid (the chromedriver process)
+
+        Returns:
+            float: RSS in MB, None if it cannot be measured
+        """
+        rss = process_tree_rss(pid) if pid else None
+        if rss is not None:
+            with self._lock:
+                self.rss_last_mb = rss
+                self.rss_peak_mb = max(self.rss_peak_mb or 0, rss)
+            self._emit("rss", "browser", rss)
+        return rss
+
+    def snapshot(self):
+        """Crawl level summary: pages/s, page latency percentiles, per-phase timings, driver and memory counters"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "pages": self.pages,
+                "failed_pages": self.failed_pages,
+                "pages_per_s": round(self.pages / elapsed, 3),
+                "cache_hits": self.cache_hits,
+                "page_latency_p50_s": self.page_latency.percentile(50),
+                "page_latency_p95_s": self.page_latency.percentile(95),
+                "driver_starts": self.driver_starts,
+                "driver_start_mean_s": round(self.driver_start_seconds / self.driver_starts, 3) if self.driver_starts else None,
+                "browser_rss_last_mb": self.rss_last_mb,
+                "browser_rss_peak_mb": self.rss_peak_mb,
+                "phases": {name: {"total_s": round(total, 3), "count": count, "mean_s": round(total / count, 4),
+                                  "p95_s": histogram.percentile(95)}
+                           for name, (total, count, histogram) in sorted(self.phases.items(), key=lambda p: -p[1][0])},
+            }
+
+    def report(self, force=False):
+        """Log the snapshot as JSON at most every interval seconds"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        self.logger.info(json.dumps(self.snapshot()))
+
+    def final_report(self, path=None):
+        """Log the final summary and, if path is given, save it as JSON"""
+        snapshot = self.snapshot()
+        self.logger.info(json.dumps(snapshot))
+        if path:
+            with open(path, "w") as metrics_file:
+                json.dump(snapshot, metrics_file, indent=2)
+        return snapshot
@@ -1,4 +1,3 @@
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -6,10 +5,48 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.service import Service
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
 import os
 import sys
+import time
+from readiness import build_condition, enable_network_events, DomQuiet
+from page_cache import render_options_key
+from extraction import has_combinator, selector_tag
+from scraper_metrics import ScraperMetrics
+from browser_service import BrowserService, forget_chromedriver, resolve_chromedriver
+from browser_profile import DEFAULT_BLOCKED_RESOURCES, apply_lightweight_options, blocked_url_patterns, install_blocking
+
+
+def default_parser():
+    """Fastest Beautiful Soup tree builder available: lxml if installed, otherwise the pure Python html.parser"""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def strainer_for_selectors(selectors):
+    """
+    Build a SoupStrainer keeping only the elements the given CSS selectors can match
+
+    The strained soup keeps the matching tags but not their ancestors, so it is only built for simple selectors
+    (e.g. 'a[href*="x"]'). Returns None (parse everything) if any selector has a combinator ('div.list a',
+    'ul > li', ...) or does not start with a tag name, so every selector still matches on the parsed soup.
+
+    Args:
+        selectors (list): CSS selectors that will be queried
+
+    Returns:
+        SoupStrainer or None
+    """
+    if any(has_combinator(selector) for selector in selectors):
+        return None
+    tags = {selector_tag(selector) for selector in selectors}
+    if None in tags:
+        return None
+    return SoupStrainer(list(tags))
 
 
 class WebScraper:
@@ -17,7 +54,22 @@ class WebScraper:
     Base class for web scraping using Selenium and Beautiful Soup
     """
 
-    def __init__(self, headless=True, timeout=10, implicit_wait=5):
+    # Selectors queried by extract_download_options, usable as parse_only
+    DOWNLOAD_SELECTORS = [
+        'a[data-click-key*="download_video"]'
+        # 'a[href*="download"]',
+        # 'button[class*="download"]',
+        # '.download-link',
+        # '.download-button',
+        # 'a[download]',
+        # '[data-track-action*="download"]',
+        # '.video-download'
+    ]
+
+    def __init__(self, headless=True, timeout=10, implicit_wait=5, readiness="ready_state", ready_timeout=None,
+                 parser=None, parse_only=None, lightweight=False, block_resources=DEFAULT_BLOCKED_RESOURCES,
+                 block_patterns=None, profile_dir=None, page_cache=None, offline=False, metrics=None,
+                 rss_sample_every=10, attach_to=None):
         """
         Initialize the web scraper
 
@@ -25,11 +77,46 @@ class WebScraper:
             headless (bool): Run browser in headless mode
             timeout (int): Explicit wait timeout in seconds
             implicit_wait (int): Implicit wait timeout in seconds
+            readiness: When a loaded page is handed off: 'ready_state' (document.readyState is complete),
+                'network_idle' (no request in flight, via CDP), 'dom_quiet' (no DOM mutations)
+                or a callable predicate(driver) -> bool
+            ready_timeout (int): Maximum seconds to wait for readiness, defaults to timeout
+            parser (str): Beautiful Soup tree builder ('lxml', 'html.parser', ...), defaults to lxml if installed
+            parse_only: CSS selectors (e.g. WebScraper.DOWNLOAD_SELECTORS) or a SoupStrainer, only the matching
+                elements are kept in the soup, which cuts parse time and memory on large pages
+            lightweight (bool): Performance profile: block block_resources, block_patterns and trackers,
+                and disable browser features the scraper does not need
+            block_resources (iterable): Resource types blocked in lightweight mode ('image', 'font', 'media',
+                'stylesheet')
+            block_patterns (list): Additional URL patterns blocked in lightweight mode ('*' wildcards)
+            profile_dir (str): Reuse this Chrome user data directory so its HTTP cache stays warm across runs
+            page_cache (PageCache): Serve fresh pages from this cache and store every page loaded
+            offline (bool): Only serve pages from page_cache, whatever their age, without launching the browser
+                (to re-run extraction on cached pages)
+            metrics (ScraperMetrics): Where phase timings, driver startups and browser memory are recorded,
+                share one instance between scrapers for a crawl level summary
+            rss_sample_every (int): Sample the browser's memory every this many pages (0 disables it)
+            attach_to: Attach to a running browser instead of launching one: a BrowserService
+                (see browser_service.py) or a Chrome remote debugging address 'host:port'.
+                The browser's own launch options apply, headless/lightweight/profile_dir are ignored.
         """
         self.timeout = timeout
+        self.readiness = readiness
+        self.ready_timeout = ready_timeout or timeout
         self.driver = None
         self.soup = None
         self.page_source = None
+        self.pages_loaded = 0
+        self.page_cache = page_cache
+        self.offline = offline
+        self.metrics = metrics or ScraperMetrics()
+        self.rss_sample_every = rss_sample_every
+        self.attach_to = attach_to
+        self.parser = parser or default_parser()
+        if parse_only is None or isinstance(parse_only, SoupStrainer):
+            self.parse_only = parse_only
+        else:
+            self.parse_only = strainer_for_selectors(parse_only)
 
         # Setup logging
         logging.basicConfig(level=logging.INFO)
@@ -43,53 +130,43 @@ class WebScraper:
         self.chrome_options.add_argument("--disable-dev-shm-usage")
         self.chrome_options.add_argument("--disable-gpu")
         self.chrome_options.add_argument("--window-size=1920,1080")
+        if readiness == "network_idle":
+            enable_network_events(self.chrome_options)
+        self.blocked_patterns = []
+        if lightweight:
+            apply_lightweight_options(self.chrome_options, block_images="image" in (block_resources or ()))
+            self.blocked_patterns = blocked_url_patterns(block_resources, block_patterns)
+        if profile_dir:
+            self.chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
 
         # Initialize driver
-        self._init_driver(implicit_wait)
+        if not offline:
+            self._init_driver(implicit_wait)
 
     def _init_driver(self, implicit_wait):
-        """Initialize the Chrome driver"""
+        """Initialize the Chrome driver, or attach to the running browser given as attach_to"""
+        started = time.perf_counter()
         try:
-            # Try multiple methods to setup ChromeDriver
-            service = None
-
-            # Method 1: Try webdriver-manager if available
-            try:
-                from webdriver_manager.chrome import ChromeDriverManager
-                service = Service(ChromeDriverManager().install())
-                self.logger.info("Using webdriver-manager for ChromeDriver")
-            except ImportError:
-                self.logger.info("webdriver-manager not available, trying alternative methods")
-            except Exception as e:
-                self.logger.warning(f"webdriver-manager failed: {e}, trying alternative methods")
-
-            # Method 2: Try to find ChromeDriver in common locations
-            if not service:
-                chromedriver_paths = [
-                    "chromedriver.exe",  # Current directory
-                    "chromedriver",  # Current directory (Linux/Mac)
-                    os.path.join(os.getcwd(), "chromedriver.exe"),
-                    "C:\\chromedriver\\chromedriver.exe",  # Common Windows location
-                    "C:\\chromedriver\\chromedriver-win64\\chromedriver.exe",  # New download format
-                    "C:\\chromedriver\\chromedriver-win32\\chromedriver.exe",  # 32-bit version
-                    "/usr/local/bin/chromedriver",  # Common Linux location
-                    "/usr/bin/chromedriver",  # Another Linux location
-                ]
-
-                for path in chromedriver_paths:
-                    if os.path.exists(path):
-                        service = Service(path)
-                        self.logger.info(f"Found ChromeDriver at: {path}")
-                        break
-
-            # Method 3: Try without specifying service (ChromeDriver in PATH)
-            if service:
-                self.driver = webdriver.Chrome(service=service, options=self.chrome_options)
+            if self.attach_to:
+                self._attach_driver()
             else:
-                self.logger.info("Trying ChromeDriver from PATH")
-                self.driver = webdriver.Chrome(options=self.chrome_options)
+                # ChromeDriver is resolved once and cached (webdriver-manager, common locations, PATH)
+                path = resolve_chromedriver()
+                try:
+                    self.driver = self._start_chrome(path)
+                except Exception as e:
+                    if not path:
+                        raise
+                    # the cached driver may no longer match Chrome (e.g. after an update), resolve it again
+                    self.logger.warning(f"Cached ChromeDriver failed: {e}, resolving it again")
+                    forget_chromedriver()
+                    self.driver = self._start_chrome(resolve_chromedriver(use_cache=False))
 
             self.driver.implicitly_wait(implicit_wait)
+            if self.blocked_patterns and hasattr(self.driver, "execute_cdp_cmd"):  # not on a Remote session
+                install_blocking(self.driver, self.blocked_patterns)
+                self.logger.info(f"Blocking {len(self.blocked_patterns)} URL patterns")
+            self.metrics.driver_started(time.perf_counter() - started)
             self.logger.info("Chrome driver initialized successfully")
 
         except Exception as e:
@@ -100,7 +177,27 @@ class WebScraper:
             self.logger.error("3. Add ChromeDriver to your system PATH")
             raise
 
-    def load_page(self, url, wait_for_element=None, wait_time=None):
+    def _start_chrome(self, chromedriver_path):
+        if chromedriver_path:
+            return webdriver.Chrome(service=Service(chromedriver_path), options=self.chrome_options)
+        self.logger.info("Trying ChromeDriver from PATH")
+        return webdriver.Chrome(options=self.chrome_options)
+
+    def _attach_driver(self):
+        """Attach to a running browser and open a tab of our own in it"""
+        options = Options()
+        if isinstance(self.attach_to, BrowserService):
+            options.debugger_address = self.attach_to.debugger_address
+            # a running ChromeDriver server avoids even the chromedriver process start
+            self.driver = webdriver.Remote(command_executor=self.attach_to.driver_url, options=options)
+        else:
+            options.debugger_address = self.attach_to
+            path = resolve_chromedriver()
+            self.driver = webdriver.Chrome(service=Service(path), options=options) if path else webdriver.Chrome(options=options)
+        self.driver.switch_to.new_window("tab")
+        self.logger.info(f"Attached to running browser at {options.debugger_address}")
+
+    def load_page(self, url, wait_for_element=None, wait_time=None, revalidate=False):
         """
         Load a web page and parse it with Beautiful Soup
 
@@ -108,37 +205,132 @@ class WebScraper:
             url (str): URL to load
             wait_for_element (tuple): Optional (By.TYPE, "selector") to wait for specific element
             wait_time (int): Custom wait time for this request
+            revalidate (bool): Load the page even if page_cache holds a fresh copy
 
         Returns:
             bool: True if page loaded successfully, False otherwise
         """
+        if not revalidate and self.load_cached(url, wait_for_element):
+            return True
+        if self.offline:
+            self.logger.error(f"Page not cached, cannot load it offline: {url}")
+            return False
+
+        started = time.perf_counter()
         try:
             self.logger.info(f"Loading page: {url}")
-            self.driver.get(url)
+            with self.metrics.phase("navigate"):
+                self.driver.get(url)
 
             # Wait for specific element if provided
             if wait_for_element:
-                wait = WebDriverWait(self.driver, wait_time or self.timeout)
-                wait.until(EC.presence_of_element_located(wait_for_element))
+                with self.metrics.phase("wait_element"):
+                    wait = WebDriverWait(self.driver, wait_time or self.timeout)
+                    wait.until(EC.presence_of_element_located(wait_for_element))
                 self.logger.info(f"Element {wait_for_element} found")
 
-            # Small delay to ensure page is fully loaded
-            time.sleep(2)
+            # Hand the page off as soon as it is actually ready
+            with self.metrics.phase("ready_wait"):
+                self.wait_until_ready()
 
             # Get page source and create Beautiful Soup object
-            self.page_source = self.driver.page_source
-            self.soup = BeautifulSoup(self.page_source, 'html.parser')
-
+            with self.metrics.phase("page_source"):
+                self.page_source = self.driver.page_source
+            self.soup = self.parse(self.page_source)
+
+            self.pages_loaded += 1
+            self.store_cached(url, wait_for_element)
+            self.metrics.page_done(time.perf_counter() - started)
+            self.sample_rss()
             self.logger.info("Page loaded and parsed successfully")
             return True
 
         except TimeoutException:
+            self.metrics.page_done(time.perf_counter() - started, ok=False)
             self.logger.error(f"Timeout waiting for element {wait_for_element}")
             return False
         except Exception as e:
+            self.metrics.page_done(time.perf_counter() - started, ok=False)
             self.logger.error(f"Error loading page: {e}")
             return False
 
+    def browser_pid(self):
+        """PID of the chromedriver process the browser runs under, None if it is not known"""
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        return getattr(process, "pid", None)
+
+    def sample_rss(self, force=False):
+        """Record the browser's memory in metrics every rss_sample_every pages (or now if force)"""
+        if force or (self.rss_sample_every and self.pages_loaded % self.rss_sample_every == 0):
+            return self.metrics.sample_rss(self.browser_pid())
+
+    def render_options(self, wait_for_element=None):
+        """Hash of the options that change how a page renders, part of the page_cache key"""
+        readiness = self.readiness if isinstance(self.readiness, str) else getattr(
+            self.readiness, "__name__", type(self.readiness).__name__)
+        return render_options_key({"readiness": readiness, "blocked": self.blocked_patterns,
+                                   "wait_for_element": wait_for_element})
+
+    def load_cached(self, url, wait_for_element=None):
+        """
+        Serve a page from page_cache if it holds a fresh copy (any copy when offline, however old)
+
+        Returns:
+            bool: True if the page was served from the cache
+        """
+        if not self.page_cache:
+            return False
+        max_age = float("inf") if self.offline else None
+        with self.metrics.phase("cache_lookup"):
+            cached = self.page_cache.get(url, self.render_options(wait_for_element), max_age=max_age)
+        if cached is None:
+            return False
+        self.page_source = cached[0]
+        self.soup = self.parse(self.page_source)
+        self.metrics.cache_hit()
+        self.logger.info(f"Served {url} from page cache")
+        return True
+
+    def store_cached(self, url, wait_for_element=None):
+        """Store the current page_source in page_cache"""
+        if self.page_cache:
+            with self.metrics.phase("cache_store"):
+                self.page_cache.set(url, self.page_source, self.render_options(wait_for_element))
+
+    def wait_until_ready(self, condition=None, timeout=None):
+        """
+        Wait until the page is ready instead of sleeping a fixed time
+
+        Args:
+            condition: Readiness condition, defaults to the one configured in __init__
+            timeout (int): Custom maximum wait, defaults to ready_timeout
+
+        Returns:
+            bool: True if the page became ready, False if the wait timed out (the page is still usable)
+        """
+        condition = condition or build_condition(self.readiness)
+        try:
+            if isinstance(condition, DomQuiet):
+                condition.start(self.driver)  # quiet time counts from now, not from the last wait on this page
+            WebDriverWait(self.driver, timeout or self.ready_timeout, poll_frequency=0.1).until(condition)
+            return True
+        except TimeoutException:
+            self.logger.warning("Page not ready before timeout, continuing with current content")
+            return False
+
+    def parse(self, html):
+        """
+        Parse HTML with the configured parser, keeping only the parse_only elements if set
+
+        Args:
+            html (str): HTML to parse
+
+        Returns:
+            BeautifulSoup: Parsed document
+        """
+        with self.metrics.phase("parse"):
+            return BeautifulSoup(html, self.parser, parse_only=self.parse_only)
+
     def get_element_by_selector(self, css_selector, multiple=False):
         """
         Extract specific HTML element(s) using CSS selector
@@ -224,18 +416,7 @@ class WebScraper:
         download_options = []
 
         # Common selectors for download links/buttons on video platforms
-        selectors_to_try = [
-            'a[data-click-key*="download_video"]'
-            # 'a[href*="download"]',
-            # 'button[class*="download"]',
-            # '.download-link',
-            # '.download-button',
-            # 'a[download]',
-            # '[data-track-action*="download"]',
-            # '.video-download'
-        ]
-
-        for selector in selectors_to_try:
+        for selector in self.DOWNLOAD_SELECTORS:
             elements = self.get_element_by_selector(selector, multiple=True)
             if elements:
                 for element in elements:
@@ -250,6 +431,21 @@ class WebScraper:
         self.logger.info(f"Found {len(download_options)} potential download options")
         return download_options
 
+    def extract(self, spec):
+        """
+        Extract the current page with a declarative spec in a single tree walk
+
+        Args:
+            spec (ExtractionSpec): Field -> rule mapping, see extraction.py
+
+        Returns:
+            dict or record: Extracted fields, None if no page is loaded
+        """
+        if not self.soup:
+            self.logger.error("No page loaded. Call load_page() first.")
+            return None
+        return spec.extract(self.soup)
+
     def get_raw_html(self, css_selector=None):
         """
         Get raw HTML content
@@ -308,7 +504,7 @@ class WebScraper:
         try:
             element = self.driver.find_element(By.CSS_SELECTOR, css_selector)
             self.driver.execute_script("arguments[0].scrollIntoView();", element)
-            time.sleep(1)  # Allow time for any lazy loading
+            self.wait_until_ready(DomQuiet(quiet_time=0.3), timeout=2)  # Allow time for any lazy loading
             return True
         except NoSuchElementException:
             self.logger.error(f"Element not found: {css_selector}")
@@ -324,12 +520,33 @@ class WebScraper:
         """
         if self.driver:
             self.page_source = self.driver.page_source
-            self.soup = BeautifulSoup(self.page_source, 'html.parser')
+            self.soup = self.parse(self.page_source)
             self.logger.info("Beautiful Soup object refreshed")
 
+    def health_check(self):
+        """
+        Check the browser is still responsive (it has not crashed or hung)
+
+        Returns:
+            bool: True if the driver answers a trivial script, False otherwise
+        """
+        if not self.driver:
+            return False
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception as e:
+            self.logger.warning(f"Driver health check failed: {e}")
+            return False
+
     def close(self):
-        """Close the browser driver"""
+        """Close the browser driver (only our own tab when attached to a running browser)"""
         if self.driver:
+            if self.attach_to:
+                try:
+                    self.driver.close()
+                except Exception as e:
+                    self.logger.warning(f"Error closing tab: {e}")
+            # the session of an attached browser only disconnects, the browser keeps running
             self.driver.quit()
             self.logger.info("Browser driver closed")
 
@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+"""
+This module provides an idempotency store for inbound webhooks.
+
+Twilio retries a webhook when it does not get a timely answer, delivering the same MessageSid again.
+The store remembers recently seen MessageSids, so redeliveries can be acknowledged without processing
+the message (and replying) a second time.
+"""
+
+
+class MessageDeduplicator:
+    """
+    Remembers MessageSids for ttl seconds in an in-memory LRU, optionally backed by SQLite.
+
+    Every lookup is O(1) in memory. With sqlite_path, seen ids also survive restarts and are shared by
+    several server processes; SQLite is only consulted for ids that are not in memory.
+
+    Attributes:
+        ttl: Seconds a MessageSid is remembered.
+        max_entries: Size of the in-memory LRU.
+        sqlite_path: Optional SQLite file persisting the seen ids.
+    """
+
+    PURGE_EVERY = 1000  # inserts between two purges of expired SQLite rows
+
+    def __init__(self, ttl: float = 24 * 3600, max_entries: int = 100000, sqlite_path: str = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sqlite_path = sqlite_path
+        self.duplicates = 0
+        self._seen = OrderedDict()  # MessageSid -> time first seen, oldest first
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._connection = None
+        if sqlite_path:
+            self._connection = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS seen_messages "
+                                     "(message_sid TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+
+    def seen_or_mark(self, message_sid: str) -> bool:
+        """
+        Atomically checks whether a MessageSid was already seen and marks it as seen.
+
+        Args:
+            message_sid: The MessageSid of the webhook.
+
+        Returns:
+            True if the message is a redelivery (skip it), False if it is new (process it).
+        """
+        now = time.time()
+        with self._lock:
+            seen_at = self._seen.get(message_sid)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._seen.move_to_end(message_sid)
+                self.duplicates += 1
+                return True
+
+            if self._connection is not None and not self._mark_in_sqlite(message_sid, now):
+                self._remember(message_sid, now)
+                self.duplicates += 1
+                return True
+
+            self._remember(message_sid, now)
+            return False
+
+    def forget(self, message_sid: str) -> None:
+        """
+        Unmarks a MessageSid, e.g. when it could not be queued and Twilio should retry it.
+        """
+        with self._lock:
+            self._seen.pop(message_sid, None)
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM seen_messages WHERE message_sid = ?", (message_sid,))
+
+    def _remember(self, message_sid: str, seen_at: float) -> None:
+        self._seen[message_sid] = seen_at
+        self._seen.move_to_end(message_sid)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def _mark_in_sqlite(self, message_sid: str, now: float) -> bool:
+        """
+        Inserts the MessageSid unless another delivery (or process) already did within ttl.
+
+        Returns:
+            True if the MessageSid is new.
+        """
+        expired = now - self.ttl
+        # an expired row is replaced, a live one is kept and means the message is a redelivery
+        cursor = self._connection.execute(
+            "INSERT INTO seen_messages (message_sid, seen_at) VALUES (?, ?) "
+            "ON CONFLICT (message_sid) DO UPDATE SET seen_at = excluded.seen_at WHERE seen_messages.seen_at < ?",
+            (message_sid, now, expired))
+        self._inserts += 1
+        if self._inserts % self.PURGE_EVERY == 0:
+            self._connection.execute("DELETE FROM seen_messages WHERE seen_at < ?", (expired,))
+        return cursor.rowcount == 1
+
+    def stats(self) -> dict:
+        return {"remembered": len(self._seen), "duplicates": self.duplicates}
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,79 @@
+import asyncio
+
+"""
+This module provides an in-process asyncio worker pool for incoming WhatsApp messages.
+
+The webhook only validates and enqueues a message, then acknowledges Twilio immediately; the workers
+process it in the background and reply through the outbound API (send_message), so Twilio's webhook
+timeout no longer depends on how long a reply takes to build.
+"""
+
+
+class MessageWorkerPool:
+    """
+    A bounded asyncio queue drained by a fixed number of worker tasks.
+
+    Attributes:
+        handler: Coroutine function called with each message dict.
+        workers: Number of worker tasks.
+        max_queue: Maximum number of messages waiting; enqueue() refuses messages beyond it.
+    """
+
+    def __init__(self, handler, workers: int = 4, max_queue: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.processed = 0
+        self.failed = 0
+        self._tasks = []
+
+    async def start(self) -> None:
+        """
+        Starts the worker tasks on the running event loop (call it from the application startup).
+        """
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    def enqueue(self, message: dict) -> bool:
+        """
+        Queues a message for processing without waiting.
+
+        Args:
+            message: The message fields (e.g. From, Body, MessageSid).
+
+        Returns:
+            True if the message was queued, False if the queue is full.
+        """
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.handler(message)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Worker {number} failed to process message {message.get('MessageSid')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self, drain_timeout: float = 10) -> None:
+        """
+        Stops the workers, first giving queued messages up to drain_timeout seconds to be processed.
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Stopping with {self.queue.qsize()} unprocessed messages")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "processed": self.processed, "failed": self.failed,
+                "workers": len(self._tasks)}
@@ -1,21 +1,79 @@
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from twilio.base.exceptions import TwilioRestException
+import asyncio
 import os
+import random
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 
 """
-This module provides a function for sending messages using the Twilio API.
+This module provides functions for sending messages using the Twilio API.
+
+The Twilio clients are long-lived: one synchronous client with a pooled HTTP session for the process,
+and one asyncio client per event loop for send_message_async and send_bulk.
 """
 
 # Load environment variables from the .env file.
 load_dotenv()
 
+# The from_ number is the Twilio WhatsApp number
+FROM_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:YOUR_TWILIO_WHATSAPP_NUMBER")
+
+# Twilio error statuses worth retrying: rate limited or a server side failure
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+_async_clients = {}  # event loop -> Client with an AsyncTwilioHttpClient
+
+
+@lru_cache(maxsize=1)
+def get_client() -> Client:
+    """
+    Returns the process wide Twilio client, created on first use.
+
+    Its HTTP client keeps a pooled session, so connections to the Twilio API are reused across messages
+    instead of a new client (and TLS handshake) per message.
+    """
+    # Get Twilio credentials from environment variables
+    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    return Client(account_sid, auth_token, http_client=TwilioHttpClient(pool_connections=True, timeout=30))
+
+
+def get_async_client() -> Client:
+    """
+    Returns the Twilio client for the running event loop, with a pooled aiohttp session.
+
+    Must be called from a coroutine; the session belongs to the loop it was created on.
+    """
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+        auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+        client = Client(account_sid, auth_token, http_client=AsyncTwilioHttpClient(timeout=30))
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """
+    Closes the HTTP session of the running event loop's client (call it before the loop ends).
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.http_client.close()
+
+
 def send_message(to: str, message: str) -> None:
     """
     Sends a WhatsApp message using the Twilio REST API client.
 
-    This function authenticates with Twilio using credentials from environment
-    variables and sends a text message to a specified recipient from your
-    Twilio WhatsApp number.
+    This function sends a text message to a specified recipient from your Twilio WhatsApp number,
+    using the shared client of get_client().
 
     You would use this for scenarios where you need to send a message to a user at a later time or from a different
     part of your application. (MessagingResponse() in webhook is for immediate responses)
@@ -31,20 +89,105 @@ def send_message(to: str, message: str) -> None:
     Raises:
         TwilioException: If the message fails to send due to an API error.
     """
-    # Get Twilio credentials from environment variables
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-
-    # Initialize the Twilio client
-    client = Client(account_sid, auth_token)
-
     try:
-        # The from_ number is the Twilio WhatsApp number
-        message = client.messages.create(
+        message = get_client().messages.create(
             body=message,
-            from_='whatsapp:YOUR_TWILIO_WHATSAPP_NUMBER',
+            from_=FROM_NUMBER,
             to=to
         )
         print(f"Message sent to {to}. SID: {message.sid}")
     except Exception as e:
-        print(f"Failed to send message: {e}")
\ No newline at end of file
+        print(f"Failed to send message: {e}")
+
+
+async def send_message_async(to: str, message: str, max_retries: int = 3) -> dict:
+    """
+    Sends a WhatsApp message without blocking the event loop, retrying rate limited and server errors.
+
+    Args:
+        to: The recipient's WhatsApp number (e.g., 'whatsapp:+1234567890').
+        message: The text content of the message to be sent.
+        max_retries: Retries after the first attempt, with exponential backoff and jitter.
+
+    Returns:
+        The message status: {'to', 'sid', 'status', 'error', 'attempts'}.
+    """
+    from aiohttp import ClientError  # the async client's transport, dropped connections and bad responses
+
+    client = get_async_client()
+    for attempt in range(1, max_retries + 2):
+        try:
+            sent = await client.messages.create_async(body=message, from_=FROM_NUMBER, to=to)
+            return {"to": to, "sid": sent.sid, "status": sent.status, "error": None, "attempts": attempt}
+        except TwilioRestException as e:
+            retryable = e.status in RETRYABLE_STATUSES
+            error = f"{e.status} {e.code}: {e.msg}"
+        except (asyncio.TimeoutError, OSError, ClientError) as e:  # connection errors
+            retryable = True
+            error = str(e) or type(e).__name__
+        if not retryable or attempt > max_retries:
+            return {"to": to, "sid": None, "status": "failed", "error": error, "attempts": attempt}
+        await asyncio.sleep(min(2 ** (attempt - 1), 30) * (0.5 + random.random()))
+
+
+class AsyncRateLimiter:
+    """
+    Spaces calls to at most rate per second across all tasks of an event loop.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def send_bulk(messages, rate_per_second: float = 10, concurrency: int = 50, max_retries: int = 3) -> list:
+    """
+    Sends many WhatsApp messages concurrently under a rate limit (e.g. a broadcast).
+
+    Args:
+        messages: Iterable of (to, message) pairs.
+        rate_per_second: Maximum messages started per second (Twilio's limit for the sender).
+        concurrency: Maximum requests in flight.
+        max_retries: Retries per message for rate limited and server errors.
+
+    Returns:
+        The status of every message, in input order (see send_message_async).
+    """
+    limiter = AsyncRateLimiter(rate_per_second)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_one(to, message):
+        async with semaphore:
+            await limiter.acquire()
+            return await send_message_async(to, message, max_retries)
+
+    messages = list(messages)
+    results = await asyncio.gather(*(send_one(to, message) for to, message in messages), return_exceptions=True)
+    # an unexpected error fails its own message only, never the whole broadcast
+    results = [{"to": to, "sid": None, "status": "failed", "error": str(result) or type(result).__name__,
+                "attempts": None} if isinstance(result, Exception) else result
+               for (to, _), result in zip(messages, results)]
+    failed = sum(1 for result in results if result["status"] == "failed")
+    print(f"Bulk send finished: {len(results) - failed} sent, {failed} failed")
+    return results
+
+
+if __name__ == "__main__":
+    async def broadcast():
+        recipients = ["whatsapp:+1234567890", "whatsapp:+1987654321"]
+        try:
+            for result in await send_bulk((to, "Hello from the bot!") for to in recipients):
+                print(result)
+        finally:
+            await close_async_client()
+
+    asyncio.run(broadcast())
@@ -3,8 +3,12 @@ from twilio.request_validator import RequestValidator
 from twilio.twiml.messaging_response import MessagingResponse
 from fastapi import FastAPI, Request, HTTPException, Response, Query
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from urllib.parse import parse_qs
+from message_queue import MessageWorkerPool
+from dedup_store import MessageDeduplicator
+from send_message import send_message_async, close_async_client
 
 """
 A webhook is a mechanism that allows an application to receive real-time notifications from other applications 
@@ -15,7 +19,8 @@ FastAPI is a modern, high-performance web framework for building APIs with Pytho
 This module defines the main FastAPI application for a WhatsApp bot.
     
 It handles incoming webhooks from the Twilio API, validates the requests for security,
-and processes incoming messages to send an automated response.
+and queues incoming messages for background workers, which send the automated response through the
+outbound API. The webhook itself acknowledges Twilio immediately with an empty TwiML response.
 
 https://www.twilio.com/docs/usage/tutorials/how-to-secure-your-flask-app-by-validating-incoming-twilio-requests#create-a-custom-decorator
 """
@@ -24,15 +29,55 @@ https://www.twilio.com/docs/usage/tutorials/how-to-secure-your-flask-app-by-vali
 # Load environment variables from the .env file.
 load_dotenv()
 
+# The validator only depends on the auth token, so it is built once instead of on every request.
+validator = RequestValidator(os.getenv("TWILIO_AUTH_TOKEN"))
+
+
+def build_reply(sender: str, body: str) -> str:
+    """
+    Builds the bot's reply to an incoming message (the place for slow work: lookups, models, APIs).
+    """
+    return f"Hey {sender}, your bot is up! You said: {body}"
+
+
+async def process_message(message: dict) -> None:
+    """
+    Processes one queued message on a worker and replies through the outbound API.
+    """
+    reply = build_reply(message.get("From"), message.get("Body"))
+    result = await send_message_async(message.get("From"), reply)
+    if result["status"] == "failed":
+        print(f"Failed to reply to {message.get('MessageSid')}: {result['error']}")
+
+
+workers = MessageWorkerPool(process_message, workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+                            max_queue=int(os.getenv("WEBHOOK_MAX_QUEUE", "1000")))
+
+
+# Twilio retries webhooks, so MessageSids seen within the TTL are acknowledged without processing them again.
+# Set WEBHOOK_DEDUP_DB to persist them across restarts and share them between server processes.
+deduplicator = MessageDeduplicator(ttl=float(os.getenv("WEBHOOK_DEDUP_TTL", str(24 * 3600))),
+                                   sqlite_path=os.getenv("WEBHOOK_DEDUP_DB"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await workers.start()
+    yield
+    await workers.stop()
+    await close_async_client()
+    deduplicator.close()
+
+
 # Initialize the FastAPI application.
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # async def initiates coroutine
 
 # Health check
 @app.get("/")
 async def home():
-    return {"message": "API is up"}
+    return {"message": "API is up", "workers": workers.stats(), "dedup": deduplicator.stats()}
 
 
 @app.post("/webhook")
@@ -40,20 +85,27 @@ async def handle_webhook(request: Request):
     form = await request.form()
     form_dict = dict(form)
 
-    validator = RequestValidator(os.getenv("TWILIO_AUTH_TOKEN"))
-
     # url = str(request.url)
     # print("Validating against URL:", url)
 
-    if not validator.validate(request.url, request.form, request.headers.get('X-TWILIO-SIGNATURE', '')):
+    if not validator.validate(str(request.url), form_dict, request.headers.get('X-TWILIO-SIGNATURE', '')):
         print("Signature mismatch")
         print("Signature header:", request.headers.get('X-TWILIO-SIGNATURE', ''))
         print("Form dict:", form_dict)
         raise HTTPException(status_code=403, detail="Invalid signature")
 
-    sender = form_dict.get("From")
-    body = form_dict.get("Body")
-
     resp = MessagingResponse()
-    resp.message(f"Hey {sender}, your bot is up! You said: {body}")
+
+    # A redelivery of a message already accepted is acknowledged as a no-op
+    message_sid = form_dict.get("MessageSid")
+    if message_sid and deduplicator.seen_or_mark(message_sid):
+        return Response(content=str(resp), media_type="application/xml")
+
+    # Acknowledge right away, the reply is sent by a worker through the outbound API
+    if not workers.enqueue(form_dict):
+        print("Message queue full, asking Twilio to retry later")
+        if message_sid:
+            deduplicator.forget(message_sid)  # let the retry through
+        raise HTTPException(status_code=503, detail="Busy")
+
     return Response(content=str(resp), media_type="application/xml")
\ No newline at end of file